@@ -1,12 +1,28 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import (
+    Flask, Response, request, jsonify, make_response, send_file, send_from_directory,
+)
 from flask_cors import CORS
-from datetime import datetime
+from datetime import date, datetime
+import functools
+import json
+import mimetypes
 import os
-import time
+import subprocess
 import threading
-
-from config import FLASK_HOST, FLASK_PORT, AUDIO_DIR, TRANSCRIBE_LOCALLY, get_persisted_setting, set_persisted_setting
-from transcribe import transcribe_entry
+import time
+import wave
+import zipfile
+from urllib.parse import quote
+
+import audio_storage
+import bulk_import
+import services
+from config import (
+    FLASK_HOST, FLASK_PORT, AUDIO_DIR, TRANSCRIBE_LOCALLY, JOB_LEASE_SECONDS,
+    get_persisted_setting, set_persisted_setting,
+)
+from events import job_events, entry_events
+from jobs import transcription_queue, PRIORITY_UPLOAD
 from wifi import (
     get_wifi_status, scan_networks, get_saved_networks,
     connect_to_network, forget_network, add_network,
@@ -15,34 +31,37 @@ from db import (
     init_db, get_entries, get_entry, create_entry, update_entry, delete_entry,
     toggle_favorite, search_entries, get_on_this_day, add_tag, remove_tag,
     get_all_tags, create_milestone, get_milestones, get_stats, get_random_prompt,
-    get_untranscribed_entries,
+    get_untranscribed_entries, claim_transcription_jobs, heartbeat_transcription_job,
+    complete_transcription_job, release_transcription_job, reset_transcription_retries,
+    get_transcription_cache_stats, get_entry_status,
+    get_data_version, apply_transcription_results, rollback_db,
 )
 
 app = Flask(__name__)
 
+STREAM_READ_BYTES = 64 * 1024
+SSE_KEEPALIVE_SECONDS = 15
+# Each open /api/events stream holds a gunicorn thread (gunicorn.conf.py):
+# cap how many, and end each after a while so the browser reconnects
+SSE_MAX_STREAMS = 6
+SSE_MAX_SECONDS = 300
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+JOB_WAIT_MAX_SECONDS = 50  # under nginx's default 60s proxy_read_timeout
+BATCH_UPDATE_MAX = 500  # results per /api/entries/batch-update call
+SEARCH_PER_PAGE_MAX = 100
+JOB_CLAIM_MAX = 50  # entries per /api/jobs/claim call
+JOB_LEASE_MIN_SECONDS = 30  # range a worker may ask a lease (or heartbeat) to last
+JOB_LEASE_MAX_SECONDS = 3600
 
-# --- Background auto-retry for failed/pending transcriptions ---
 
-def _auto_retry_loop():
-    """Every 60s, retry any failed or pending transcriptions."""
-    time.sleep(15)  # wait for startup
-    while True:
-        try:
-            entries = get_untranscribed_entries()
-            for entry in entries:
-                audio_path = os.path.join(AUDIO_DIR, entry["audio_filename"])
-                if not os.path.exists(audio_path):
-                    continue
-                print(f"[auto-retry] Retrying transcription for entry {entry['id']}")
-                transcribe_entry(entry["id"], audio_path)
-        except Exception as e:
-            print(f"[auto-retry] Error: {e}")
-        time.sleep(60)
+CORS(app)  # Allow 11ty dev server to call API
 
 
-_retry_thread = threading.Thread(target=_auto_retry_loop, daemon=True)
-_retry_thread.start()
-CORS(app)  # Allow 11ty dev server to call API
+@app.teardown_appcontext
+def release_db(exc):
+    # gthread reuses threads, and with them the pooled connection; don't
+    # let a request that raised mid-transaction keep the write lock
+    rollback_db()
 
 
 def entry_to_dict(entry, tags=None):
@@ -53,24 +72,79 @@ def entry_to_dict(entry, tags=None):
     return d
 
 
+def conditional(daily=False):
+    """Answer If-None-Match with 304 while the data hasn't changed.
+
+    Responses get a weak ETag from the database's data version (plus the
+    date for views that depend on it, like the streak), so a repeat load
+    costs one primary-key read instead of the view's queries and JSON.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Read before the view runs: a write in between only makes the
+            # tag older than the body, which just costs a refetch later
+            tag = str(get_data_version())
+            if daily:
+                tag += f"-{date.today().isoformat()}"
+            if request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"  # always revalidate
+            return response
+        return wrapper
+    return decorator
+
+
+def parse_cursor(cursor):
+    """Split a "<created_at>,<id>" cursor into a (created_at, id) tuple.
+
+    Returns None if the cursor is malformed.
+    """
+    created_at, _, entry_id = cursor.rpartition(",")
+    if not created_at or not entry_id.isdigit():
+        return None
+    return created_at, int(entry_id)
+
+
+def make_cursor(entry):
+    return f"{entry['created_at']},{entry['id']}"
+
+
 # --- Entry endpoints ---
 
 @app.route("/api/entries")
+@conditional()
 def api_entries():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 20, type=int)
     favorites = request.args.get("favorites", "false") == "true"
     tag = request.args.get("tag", None)
-    entries, total = get_entries(page=page, per_page=per_page, favorites_only=favorites, tag=tag)
+    if page < 1 or per_page < 1:
+        return jsonify({"error": "page and per_page must be at least 1"}), 400
+    before = None
+    if request.args.get("before"):
+        before = parse_cursor(request.args["before"])
+        if before is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    entries, total = get_entries(page=page, per_page=per_page, favorites_only=favorites,
+                                 tag=tag, before=before)
+    next_cursor = make_cursor(entries[-1]) if entries and len(entries) == per_page else None
     return jsonify({
         "entries": [entry_to_dict(e) for e in entries],
         "total": total,
         "page": page,
         "per_page": per_page,
+        "next_cursor": next_cursor,
     })
 
 
 @app.route("/api/entries/<int:entry_id>")
+@conditional()
 def api_entry_detail(entry_id):
     entry, tags = get_entry(entry_id)
     if not entry:
@@ -78,9 +152,73 @@ def api_entry_detail(entry_id):
     return jsonify(entry_to_dict(entry, tags))
 
 
+_sse_streams = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+
+def _sse(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/api/events")
+def api_events():
+    """Server-Sent Events stream of transcription status changes.
+
+    Sends a "status" event ({"id", "transcription_status"}) whenever an
+    entry is created or its status changes. ?entry=<id> limits the stream
+    to one entry and starts it with that entry's current status. A
+    "resync" event means events were missed (buffer overrun or API restart)
+    and clients should re-fetch what they show. Reconnecting browsers
+    resume from Last-Event-ID.
+
+    At most SSE_MAX_STREAMS streams are open at once (503 beyond that),
+    and each ends after SSE_MAX_SECONDS; the browser reconnects after the
+    retry: delay and picks up where it left off.
+    """
+    entry_id = request.args.get("entry", type=int)
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    # Taken before reading the initial status so no change falls in between
+    start = entry_events.version if last_id is None else last_id
+    initial = None
+    if entry_id is not None:
+        initial = get_entry_status(entry_id)
+        if initial is None:
+            return jsonify({"error": "Entry not found"}), 404
+    if not _sse_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many open event streams"}), 503, {"Retry-After": "30"}
+
+    def stream():
+        version = start
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        yield "retry: 3000\n\n"
+        if initial is not None:
+            yield _sse("status", {"id": entry_id, "transcription_status": initial}, version)
+        while time.monotonic() < deadline:
+            new_version, events, complete = entry_events.read(version, SSE_KEEPALIVE_SECONDS)
+            if not complete:
+                yield _sse("resync", {}, new_version)
+            for event in events:
+                if entry_id is None or event["id"] == entry_id:
+                    yield _sse("status", event, new_version)
+            if new_version == version:
+                yield ": keepalive\n\n"  # also notices clients that went away
+            version = new_version
+        # No event, just the id: the reconnect sends it as Last-Event-ID
+        yield f"id: {version}\n\n"
+
+    response = Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: pass events straight through
+    })
+    # Not a finally in stream(): a generator that never started wouldn't run it
+    response.call_on_close(_sse_streams.release)
+    return response
+
+
 @app.route("/api/entries/untranscribed")
 def api_untranscribed():
-    entries = get_untranscribed_entries()
+    entries = get_untranscribed_entries(due_only=True)
     return jsonify({"entries": [dict(e) for e in entries]})
 
 
@@ -98,8 +236,10 @@ def api_create_entry():
         if audio:
             timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
             ext = os.path.splitext(audio.filename)[1] or ".webm"
-            audio_filename = f"{timestamp}{ext}"
-            audio.save(os.path.join(AUDIO_DIR, audio_filename))
+            audio_path = os.path.join(AUDIO_DIR, f"{timestamp}{ext}")
+            audio.save(audio_path)
+            # WAVs are transcoded to the storage codec; returns where it ended up
+            audio_filename = os.path.basename(audio_storage.compress(audio_path))
 
         entry_id = create_entry(
             audio_filename=audio_filename,
@@ -116,15 +256,8 @@ def api_create_entry():
                     add_tag(entry_id, tag_name)
 
         # Kick off background transcription for audio entries
-        if audio_filename and TRANSCRIBE_LOCALLY:
-            audio_path = os.path.join(AUDIO_DIR, audio_filename)
-            client_key = request.headers.get("X-OpenAI-Key")
-            threading.Thread(
-                target=transcribe_entry,
-                args=(entry_id, audio_path),
-                kwargs={"client_key": client_key},
-                daemon=True,
-            ).start()
+        if audio_filename:
+            _queue_transcription(entry_id, audio_filename)
 
         entry, tags = get_entry(entry_id)
         return jsonify(entry_to_dict(entry, tags)), 201
@@ -146,6 +279,79 @@ def api_create_entry():
     return jsonify(entry_to_dict(entry, tags)), 201
 
 
+def _queue_transcription(entry_id, audio_filename):
+    """Start background transcription of a new recording on the Pi.
+
+    Also wakes remote workers long-polling /api/jobs/wait and, in
+    production, the separate services process, which queues the entry
+    itself (without the request's X-OpenAI-Key).
+    """
+    job_events.notify()
+    if not TRANSCRIBE_LOCALLY or not services.INLINE:
+        return
+    audio_path = os.path.join(AUDIO_DIR, audio_filename)
+    client_key = request.headers.get("X-OpenAI-Key")
+    transcription_queue.submit(entry_id, audio_path, priority=PRIORITY_UPLOAD,
+                               client_key=client_key)
+
+
+@app.route("/api/entries/stream", methods=["POST"])
+def api_stream_entry():
+    """Create a voice entry from audio streamed while it is being recorded.
+
+    The body is raw 16-bit little-endian mono PCM (audio/L16), normally
+    sent with chunked transfer encoding as it is captured. It is written
+    straight into a WAV in the audio directory, so when the stream ends the
+    entry only needs to be stored and queued. Query args: rate (default
+    16000), source (default "recorder").
+    """
+    rate = request.args.get("rate", 16000, type=int)
+    source = request.args.get("source", "recorder")
+    if not 8000 <= rate <= 48000:
+        return jsonify({"error": "rate must be 8000-48000"}), 400
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    audio_path = os.path.join(AUDIO_DIR, f"{timestamp}.wav")
+    partial = audio_path + ".part"
+    nbytes = 0
+    with wave.open(partial, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        leftover = b""
+        try:
+            while True:
+                chunk = request.stream.read(STREAM_READ_BYTES)
+                if not chunk:
+                    break
+                chunk = leftover + chunk
+                usable = len(chunk) - len(chunk) % 2
+                w.writeframesraw(chunk[:usable])
+                leftover = chunk[usable:]
+                nbytes += usable
+        except Exception as e:
+            # Keep whatever arrived before the recorder went away
+            print(f"[stream] Upload interrupted after {nbytes // 1024}KB: {e}")
+
+    duration = nbytes / 2 / rate
+    if duration < 0.5:
+        os.remove(partial)
+        return jsonify({"error": "Recording too short"}), 400
+    os.replace(partial, audio_path)
+    audio_filename = os.path.basename(audio_storage.compress(audio_path))
+
+    entry_id = create_entry(
+        audio_filename=audio_filename,
+        duration_seconds=round(duration, 1),
+        source=source,
+    )
+    print(f"[stream] Entry {entry_id}: {duration:.1f}s streamed")
+    _queue_transcription(entry_id, audio_filename)
+
+    entry, tags = get_entry(entry_id)
+    return jsonify(entry_to_dict(entry, tags)), 201
+
+
 @app.route("/api/entries/<int:entry_id>", methods=["PUT"])
 def api_update_entry(entry_id):
     data = request.get_json() or {}
@@ -159,6 +365,64 @@ def api_update_entry(entry_id):
     return jsonify(entry_to_dict(entry, tags))
 
 
+@app.route("/api/entries/bulk", methods=["POST"])
+def api_bulk_import():
+    """Import many entries at once (see bulk_import.py).
+
+    Send JSON lines (one entry per line) as the body, or a zip of
+    recordings as the multipart field "archive". Responds with how many
+    were inserted, the rows/second rate and any lines that were skipped.
+    """
+    archive = request.files.get("archive")
+    if archive is not None:
+        try:
+            report = bulk_import.import_archive(archive.stream)
+        except zipfile.BadZipFile:
+            return jsonify({"error": "archive must be a zip file"}), 400
+    elif request.content_type and "multipart/form-data" in request.content_type:
+        return jsonify({"error": "archive file required"}), 400
+    else:
+        report = bulk_import.import_jsonl(request.stream)
+    if report["pending"]:
+        job_events.notify()
+    return jsonify(report), 201
+
+
+@app.route("/api/entries/batch-update", methods=["POST"])
+def api_batch_update_entries():
+    """Apply many transcription results in one transaction.
+
+    Body: {"results": [{"id", "transcription", "transcription_status",
+    "speech_seconds", "error"}, ...], "worker_id": optional}. With a
+    worker_id each result completes that worker's lease (as
+    /api/jobs/<id>/complete); without, it's a plain update (as PUT
+    /api/entries/<id>). The response lists, per id, whether it was applied.
+    """
+    data = request.get_json() or {}
+    results = data.get("results")
+    if not isinstance(results, list) or not results:
+        return jsonify({"error": "results must be a non-empty list"}), 400
+    if len(results) > BATCH_UPDATE_MAX:
+        return jsonify({"error": f"At most {BATCH_UPDATE_MAX} results per batch"}), 400
+    worker_id = _job_worker_id(data)
+    if worker_id is None:
+        return jsonify({"error": "worker_id must be a string"}), 400
+    allowed = ("done", "failed") if worker_id else ("pending", "done", "failed")
+    for result in results:
+        if not isinstance(result, dict) or not isinstance(result.get("id"), int):
+            return jsonify({"error": "Each result needs an integer id"}), 400
+        status = result.get("transcription_status")
+        if status is not None and status not in allowed:
+            return jsonify({"error": f"transcription_status must be one of {', '.join(allowed)}"}), 400
+        speech_seconds = result.get("speech_seconds")
+        if speech_seconds is not None and not isinstance(speech_seconds, (int, float)):
+            return jsonify({"error": "speech_seconds must be a number"}), 400
+    applied = apply_transcription_results(results, worker_id=worker_id or None)
+    print(f"[batch] Applied {sum(applied)}/{len(results)} transcription results")
+    return jsonify({"results": [{"id": result["id"], "applied": ok}
+                                for result, ok in zip(results, applied)]})
+
+
 @app.route("/api/entries/<int:entry_id>/retry-transcription", methods=["POST"])
 def api_retry_transcription(entry_id):
     entry, tags = get_entry(entry_id)
@@ -167,17 +431,25 @@ def api_retry_transcription(entry_id):
     if not entry["audio_filename"]:
         return jsonify({"error": "No audio file for this entry"}), 400
 
-    # Reset status to pending and kick off transcription
-    update_entry(entry_id, transcription_status="pending")
+    # Already queued or running — don't start a second transcription
+    # (in production the services process checks its own queue, and the
+    # transcription lease stops duplicates)
+    if services.INLINE and transcription_queue.is_active(entry_id):
+        return jsonify(entry_to_dict(entry, tags))
+
+    # Reset status to pending with a fresh attempt budget (this also revives
+    # 'dead' entries) and queue transcription. The user is waiting on it, so
+    # it goes ahead of background retries.
+    reset_transcription_retries(entry_id)
+    job_events.notify()
+    if not services.INLINE:
+        entry, tags = get_entry(entry_id)
+        return jsonify(entry_to_dict(entry, tags))
     audio_path = os.path.join(AUDIO_DIR, entry["audio_filename"])
     data = request.get_json() or {}
     client_key = data.get("openai_key") or request.headers.get("X-OpenAI-Key")
-    threading.Thread(
-        target=transcribe_entry,
-        args=(entry_id, audio_path),
-        kwargs={"client_key": client_key},
-        daemon=True,
-    ).start()
+    transcription_queue.submit(entry_id, audio_path, priority=PRIORITY_UPLOAD,
+                               client_key=client_key)
 
     entry, tags = get_entry(entry_id)
     return jsonify(entry_to_dict(entry, tags))
@@ -216,31 +488,179 @@ def api_remove_tag(entry_id):
     return jsonify(entry_to_dict(entry, tags))
 
 
+# --- Transcription job leases (remote workers) ---
+
+def _job_worker_id(data):
+    """The request's worker_id, stripped; None if it isn't a string."""
+    worker_id = data.get("worker_id") or ""
+    if not isinstance(worker_id, str):
+        return None
+    return worker_id.strip()
+
+
+def _clamped_int(value, low, high):
+    """`value` as an int within [low, high]; None if it isn't a number."""
+    try:
+        return min(max(int(value), low), high)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _job_lease_seconds(data):
+    return _clamped_int(data.get("lease_seconds", JOB_LEASE_SECONDS),
+                        JOB_LEASE_MIN_SECONDS, JOB_LEASE_MAX_SECONDS)
+
+
+@app.route("/api/jobs/claim", methods=["POST"])
+def api_claim_jobs():
+    data = request.get_json() or {}
+    worker_id = _job_worker_id(data)
+    if not worker_id:
+        return jsonify({"error": "worker_id required"}), 400
+    limit = _clamped_int(data.get("limit", 1), 1, JOB_CLAIM_MAX)
+    lease_seconds = _job_lease_seconds(data)
+    if limit is None or lease_seconds is None:
+        return jsonify({"error": "limit and lease_seconds must be numbers"}), 400
+    entries, lease_expires_at = claim_transcription_jobs(
+        worker_id, limit=limit, lease_seconds=lease_seconds)
+    jobs = []
+    for entry in entries:
+        job = dict(entry)
+        # Let the worker verify its streamed download
+        audio_path = os.path.join(AUDIO_DIR, entry["audio_filename"])
+        if os.path.isfile(audio_path):
+            job["audio_size"] = os.path.getsize(audio_path)
+            job["audio_sha256"] = audio_storage.file_sha256(audio_path)
+        jobs.append(job)
+    return jsonify({
+        "jobs": jobs,
+        "lease_expires_at": lease_expires_at,
+    })
+
+
+@app.route("/api/jobs/<int:entry_id>/heartbeat", methods=["POST"])
+def api_heartbeat_job(entry_id):
+    data = request.get_json() or {}
+    worker_id = _job_worker_id(data)
+    if worker_id is None:
+        return jsonify({"error": "worker_id must be a string"}), 400
+    lease_seconds = _job_lease_seconds(data)
+    if lease_seconds is None:
+        return jsonify({"error": "lease_seconds must be a number"}), 400
+    if not heartbeat_transcription_job(entry_id, worker_id, lease_seconds):
+        return jsonify({"error": "Lease not held"}), 409
+    return jsonify({"success": True})
+
+
+@app.route("/api/jobs/<int:entry_id>/complete", methods=["POST"])
+def api_complete_job(entry_id):
+    data = request.get_json() or {}
+    worker_id = _job_worker_id(data)
+    if worker_id is None:
+        return jsonify({"error": "worker_id must be a string"}), 400
+    status = data.get("transcription_status", "done")
+    if status not in ("done", "failed"):
+        return jsonify({"error": "transcription_status must be done or failed"}), 400
+    speech_seconds = data.get("speech_seconds")
+    if speech_seconds is not None and not isinstance(speech_seconds, (int, float)):
+        return jsonify({"error": "speech_seconds must be a number"}), 400
+    if not complete_transcription_job(entry_id, worker_id,
+                                      transcription=data.get("transcription"),
+                                      transcription_status=status,
+                                      error=data.get("error"),
+                                      speech_seconds=speech_seconds):
+        return jsonify({"error": "Lease not held"}), 409
+    return jsonify({"success": True})
+
+
+@app.route("/api/jobs/<int:entry_id>/release", methods=["POST"])
+def api_release_job(entry_id):
+    data = request.get_json() or {}
+    worker_id = _job_worker_id(data)
+    if worker_id is None:
+        return jsonify({"error": "worker_id must be a string"}), 400
+    release_transcription_job(entry_id, worker_id)
+    job_events.notify()
+    return jsonify({"success": True})
+
+
+@app.route("/api/jobs/wait")
+def api_wait_for_jobs():
+    """Long-poll for new transcription work.
+
+    Blocks until something became claimable after version `since` (from a
+    previous call), or `timeout` seconds (default 30, max
+    JOB_WAIT_MAX_SECONDS) pass. Without
+    `since` it returns the current version immediately. Workers claim after
+    every return, so a timeout doubles as the fallback poll.
+    """
+    since = request.args.get("since", type=int)
+    timeout = min(max(request.args.get("timeout", 30, type=float), 0), JOB_WAIT_MAX_SECONDS)
+    if since is None:
+        return jsonify({"version": job_events.version})
+    return jsonify({"version": job_events.wait(since, timeout)})
+
+
+@app.route("/api/transcription/queue")
+def api_transcription_queue():
+    if not services.INLINE:
+        return jsonify({"error": "The queue runs in murmur-services; see its log"}), 404
+    return jsonify(transcription_queue.metrics())
+
+
+@app.route("/api/transcription/cache")
+def api_transcription_cache():
+    return jsonify(get_transcription_cache_stats())
+
+
 # --- Search ---
 
 @app.route("/api/search")
 def api_search():
     query = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 20, type=int)
+    if page < 1 or not 1 <= per_page <= SEARCH_PER_PAGE_MAX:
+        return jsonify({"error": "page must be at least 1 and per_page "
+                                 f"between 1 and {SEARCH_PER_PAGE_MAX}"}), 400
     if not query:
-        return jsonify({"entries": [], "query": ""})
-    entries = search_entries(query)
+        return jsonify({"entries": [], "query": "", "total": 0, "page": page, "per_page": per_page})
+    entries, total = search_entries(query, page=page, per_page=per_page)
     return jsonify({
         "entries": [entry_to_dict(e) for e in entries],
         "query": query,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
     })
 
 
 # --- On This Day ---
 
+ON_THIS_DAY_MAX_WINDOW = 15
+
+
 @app.route("/api/on-this-day")
 def api_on_this_day():
-    entries = get_on_this_day()
-    return jsonify({"entries": [entry_to_dict(e) for e in entries]})
+    month_day = request.args.get("date") or datetime.now().strftime("%m-%d")
+    window = request.args.get("window", 0, type=int)
+    try:
+        datetime.strptime(f"2000-{month_day}", "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "date must be MM-DD"}), 400
+    window = max(0, min(window, ON_THIS_DAY_MAX_WINDOW))
+    entries = get_on_this_day(month_day=month_day, window=window)
+    return jsonify({
+        "entries": [entry_to_dict(e) for e in entries],
+        "date": month_day,
+        "window": window,
+    })
 
 
 # --- Tags ---
 
 @app.route("/api/tags")
+@conditional()
 def api_tags():
     tags = get_all_tags()
     return jsonify({"tags": [dict(t) for t in tags]})
@@ -249,6 +669,7 @@ def api_tags():
 # --- Milestones ---
 
 @app.route("/api/milestones")
+@conditional()
 def api_milestones_list():
     milestones = get_milestones()
     return jsonify({"milestones": [dict(m) for m in milestones]})
@@ -271,6 +692,7 @@ def api_create_milestone():
 # --- Stats ---
 
 @app.route("/api/stats")
+@conditional(daily=True)
 def api_stats():
     return jsonify(get_stats())
 
@@ -363,10 +785,41 @@ def api_set_openai_key():
 
 @app.route("/api/audio/<filename>")
 def api_serve_audio(filename):
-    return send_from_directory(AUDIO_DIR, filename)
+    """Serve a recording.
+
+    Behind nginx (which sends X-Accel-Audio with its internal location)
+    the file is handed back to nginx with X-Accel-Redirect, so nginx
+    streams it with sendfile and handles Range itself. Direct requests
+    are served by Flask, which also answers Range with 206. A stored file
+    never changes under its name, so it can be cached for good.
+    """
+    stored = audio_storage.stored_filename(filename)
+    if stored is None:
+        return jsonify({"error": "Audio not found"}), 404
+    # ?format=wav: decode FLAC/Opus for players that can't play them
+    if request.args.get("format") == "wav" and stored.endswith(audio_storage.COMPRESSED):
+        try:
+            wav_path = audio_storage.cached_wav(os.path.join(AUDIO_DIR, stored))
+        except (OSError, subprocess.SubprocessError) as e:
+            return jsonify({"error": f"Could not decode audio: {e}"}), 500
+        response = send_file(wav_path, mimetype="audio/wav", conditional=True)
+    elif request.headers.get("X-Accel-Audio"):
+        response = Response(mimetype=mimetypes.guess_type(stored)[0] or "application/octet-stream")
+        # Quoted: imported recordings keep names that may not be latin-1
+        # (unsendable as a header) or may contain % and ? (misread by nginx)
+        response.headers["X-Accel-Redirect"] = request.headers["X-Accel-Audio"] + quote(stored)
+    else:
+        response = send_from_directory(AUDIO_DIR, stored, conditional=True)
+    response.headers["Cache-Control"] = AUDIO_CACHE_CONTROL
+    return response
 
 
 if __name__ == "__main__":
+    # Development server. Production runs gunicorn (wsgi.py) plus
+    # services.py; see gunicorn.conf.py.
     init_db()
+    # With the reloader this module runs twice; only the child serves
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        services.start_inline()
     print(f"\n  Murmur API running at http://localhost:{FLASK_PORT}\n")
     app.run(host=FLASK_HOST, port=FLASK_PORT, debug=True)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Compressed on-disk storage for recordings.
+
+WAV uploads (the recorder's 16 kHz 16-bit output, or browser WAVs) are
+transcoded on ingest to AUDIO_STORAGE_CODEC:
+
+    flac  lossless, roughly half the size of the WAV (sox)
+    opus  lossy speech codec at OPUS_BITRATE_KBPS, ~5% of the WAV (opusenc)
+    wav   keep files exactly as received
+
+Already-compressed browser uploads (webm/m4a) are stored as they are. The
+codec is recorded in entries.audio_codec. /api/audio/<filename> keeps
+serving a migrated recording under its old .wav name, and ?format=wav
+decodes it for players that can't handle the stored codec (once; the
+decode is kept in WAV_CACHE_DIR for the Range requests that follow).
+
+Convert the existing archive (prints a before/after disk-usage report):
+    python3 audio_storage.py --migrate [--codec flac|opus] [--dry-run]
+"""
+
+import hashlib
+import io
+import mimetypes
+import os
+import subprocess
+import sys
+import threading
+import wave
+
+from config import (
+    AUDIO_DIR, AUDIO_STORAGE_CODEC, OPUS_BITRATE_KBPS, WAV_CACHE_DIR, WAV_CACHE_MAX_BYTES,
+)
+
+CODEC_EXTENSIONS = {"flac": ".flac", "opus": ".opus"}
+COMPRESSED = tuple(CODEC_EXTENSIONS.values())
+# Transcription statuses that no transcriber will pick up by itself again
+SETTLED_STATUSES = ("done", "none", "dead")
+
+# Not in every Python's mimetypes table; send_from_directory relies on it
+mimetypes.add_type("audio/flac", ".flac")
+mimetypes.add_type("audio/ogg", ".opus")
+
+
+def _encode_cmd(src, dst, codec):
+    if codec == "flac":
+        return ["sox", src, dst]
+    return ["opusenc", "--quiet", "--downmix-mono", "--bitrate", str(OPUS_BITRATE_KBPS), src, dst]
+
+
+def compress(filepath, codec=AUDIO_STORAGE_CODEC):
+    """Transcode a WAV to `codec` next to it and remove the WAV.
+
+    Returns the path of the stored file: the new one, or `filepath` itself
+    if it isn't a WAV, the codec is "wav", or encoding failed (the original
+    is kept in that case, so a missing encoder never loses a recording).
+    """
+    base, ext = os.path.splitext(filepath)
+    if codec not in CODEC_EXTENSIONS or ext.lower() != ".wav":
+        return filepath
+    target = base + CODEC_EXTENSIONS[codec]
+    tmp = base + ".tmp" + CODEC_EXTENSIONS[codec]  # encoders pick the format from the extension
+    try:
+        subprocess.run(_encode_cmd(filepath, tmp, codec), check=True,
+                       capture_output=True, timeout=120)
+        os.replace(tmp, target)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[storage] Could not encode {os.path.basename(filepath)} as {codec}: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return filepath
+    os.remove(filepath)
+    return target
+
+
+def decode_wav_bytes(filepath):
+    """Decode a stored recording to 16-bit WAV bytes."""
+    if filepath.lower().endswith(".opus"):
+        # opusdec only writes a WAV header to a .wav path; wrap its raw
+        # stdout (48 kHz mono, as encoded) ourselves
+        pcm = subprocess.run(["opusdec", "--quiet", "--rate", "48000", filepath, "-"],
+                             check=True, capture_output=True, timeout=120).stdout
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(48000)
+            w.writeframes(pcm)
+        return buf.getvalue()
+    return subprocess.run(["sox", filepath, "-t", "wav", "-b", "16", "-"],
+                          check=True, capture_output=True, timeout=120).stdout
+
+
+def cached_wav(filepath):
+    """Path of a decoded WAV copy of a stored recording, decoding it if needed.
+
+    Seeking browsers send a Range request per jump, so the decode is kept
+    in WAV_CACHE_DIR, keyed by name, size and mtime (stored recordings
+    never change in place). The least recently used copies are removed
+    once the cache passes WAV_CACHE_MAX_BYTES.
+    """
+    st = os.stat(filepath)
+    name = f"{os.path.basename(filepath)}-{st.st_size}-{int(st.st_mtime)}.wav"
+    path = os.path.join(WAV_CACHE_DIR, name)
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used
+        return path
+    os.makedirs(WAV_CACHE_DIR, exist_ok=True)
+    wav = decode_wav_bytes(filepath)
+    part = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(part, "wb") as f:
+        f.write(wav)
+    os.replace(part, path)
+    _prune_wav_cache()
+    return path
+
+
+def _prune_wav_cache():
+    entries = []
+    for name in os.listdir(WAV_CACHE_DIR):
+        if name.endswith(".wav"):
+            try:
+                st = os.stat(os.path.join(WAV_CACHE_DIR, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries)[:-1]:  # always keep the newest
+        if total <= WAV_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(os.path.join(WAV_CACHE_DIR, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def stored_filename(filename):
+    """Map a requested audio filename to the file on disk.
+
+    Links made before a recording was migrated (share text files, cached
+    pages) still name the .wav; they resolve to its FLAC/Opus successor.
+    """
+    if os.path.isfile(os.path.join(AUDIO_DIR, filename)):
+        return filename
+    stem = os.path.splitext(filename)[0]
+    for ext in COMPRESSED:
+        if os.path.isfile(os.path.join(AUDIO_DIR, stem + ext)):
+            return stem + ext
+    return None
+
+
+def file_sha256(filepath):
+    """SHA-256 of a stored file's bytes, so remote workers can verify downloads."""
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+               if os.path.isfile(os.path.join(path, f)))
+
+
+def _mb(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def migrate(codec=AUDIO_STORAGE_CODEC, dry_run=False):
+    """Transcode every archived WAV to `codec` and point its entry at the new file.
+
+    Only entries whose transcription is settled (SETTLED_STATUSES) and not
+    leased by a worker are converted; the rest — pending, queued, failed
+    and waiting to retry — are left for a later run so a file is never
+    swapped out from under the transcriber.
+    """
+    from db import init_db, get_wav_entries, set_entry_audio
+
+    if codec not in CODEC_EXTENSIONS:
+        print(f"Nothing to do for codec '{codec}'")
+        return
+    init_db()
+    entries = get_wav_entries()
+    before_dir = _dir_size(AUDIO_DIR)
+    print(f"Migrating {len(entries)} WAV recordings to {codec}"
+          f"{' (dry run)' if dry_run else ''}...")
+
+    before = after = done = skipped = 0
+    for i, entry in enumerate(entries, 1):
+        fname = entry["audio_filename"]
+        src = os.path.join(AUDIO_DIR, fname)
+        if (entry["transcription_status"] not in SETTLED_STATUSES or entry["leased"]
+                or not os.path.isfile(src)):
+            skipped += 1
+            continue
+        size = os.path.getsize(src)
+        if dry_run:
+            before += size
+            continue
+        stored = compress(src, codec)
+        if stored == src:
+            skipped += 1
+            continue
+        new_size = os.path.getsize(stored)
+        set_entry_audio(entry["id"], os.path.basename(stored), codec)
+        before += size
+        after += new_size
+        done += 1
+        print(f"  [{i}/{len(entries)}] {fname} {size // 1024}KB -> {new_size // 1024}KB")
+
+    if dry_run:
+        print(f"\n{len(entries) - skipped} files, {_mb(before)} of WAV would be converted "
+              f"({skipped} skipped)")
+        return
+    after_dir = _dir_size(AUDIO_DIR)
+    saved = before - after
+    print(f"\nConverted {done} files ({skipped} skipped: awaiting transcription, missing or failed)")
+    print(f"  Converted files: {_mb(before)} -> {_mb(after)}"
+          f" (saved {_mb(saved)}, {100 * saved // max(before, 1)}%)")
+    print(f"  {AUDIO_DIR}: {_mb(before_dir)} -> {_mb(after_dir)}")
+
+
+if __name__ == "__main__":
+    if "--migrate" in sys.argv:
+        codec = AUDIO_STORAGE_CODEC
+        if "--codec" in sys.argv:
+            codec = sys.argv[sys.argv.index("--codec") + 1]
+        migrate(codec, dry_run="--dry-run" in sys.argv)
+    else:
+        print(__doc__)
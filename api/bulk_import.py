@@ -0,0 +1,255 @@
+"""Bulk import of journal entries: JSON lines, or a zip archive of recordings.
+
+Backs POST /api/entries/bulk, and works from the command line on the Pi:
+    cd /home/murmur/murmur/api && python3 bulk_import.py voice-memos.zip
+    python3 bulk_import.py entries.jsonl
+
+Each JSON line is one entry with any of created_at, notes, transcription,
+tags, is_favorite, duration_seconds, source and audio. An archive holds
+recordings plus an optional entries.jsonl whose "audio" fields name files
+in the archive; recordings the manifest doesn't mention get an entry of
+their own, dated from the filename (2025-03-01_143022.m4a) or the archive
+timestamp. In a bare JSON lines import, "audio" names a file already in
+AUDIO_DIR. Everything is written by db.bulk_insert_entries, one
+transaction per BULK_INSERT_BATCH rows.
+
+Imported WAVs stay WAV; `python3 audio_storage.py --migrate` compresses
+them afterwards.
+"""
+
+import json
+import os
+import shutil
+import wave
+import zipfile
+from datetime import datetime
+
+from config import AUDIO_DIR
+from db import bulk_insert_entries
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".opus", ".mp3", ".webm", ".m4a")
+MANIFEST = "entries.jsonl"
+STATUSES = ("pending", "done", "none")
+
+
+def created_from_filename(filename, fallback):
+    """Recording time from a name like 2025-03-01_143022.wav, else `fallback`."""
+    try:
+        return datetime.strptime(os.path.splitext(os.path.basename(filename))[0],
+                                 "%Y-%m-%d_%H%M%S")
+    except ValueError:
+        return fallback
+
+
+def parse_entry(data):
+    """Validate one JSON entry into bulk_insert_entries form. Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("entry must be a JSON object")
+    entry = {}
+    if data.get("created_at") is not None:
+        try:
+            created = datetime.fromisoformat(str(data["created_at"]))
+        except ValueError:
+            raise ValueError(f"created_at is not an ISO date: {data['created_at']!r}")
+        if created.tzinfo is not None:
+            # Stored timestamps are naive local time, like the Pi's own
+            created = created.astimezone().replace(tzinfo=None)
+        entry["created_at"] = created
+    for key in ("notes", "transcription", "source"):
+        if data.get(key) is not None:
+            if not isinstance(data[key], str):
+                raise ValueError(f"{key} must be a string")
+            entry[key] = data[key]
+    if data.get("duration_seconds") is not None:
+        if not isinstance(data["duration_seconds"], (int, float)):
+            raise ValueError("duration_seconds must be a number")
+        entry["duration_seconds"] = data["duration_seconds"]
+    tags = data.get("tags") or []
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise ValueError("tags must be a list of strings")
+    entry["tags"] = tags
+    entry["is_favorite"] = bool(data.get("is_favorite"))
+    status = data.get("transcription_status")
+    if status is not None:
+        if status not in STATUSES:
+            raise ValueError(f"transcription_status must be one of {', '.join(STATUSES)}")
+        entry["transcription_status"] = status
+    if data.get("audio") is not None:
+        if not isinstance(data["audio"], str):
+            raise ValueError("audio must be a filename")
+        entry["audio"] = data["audio"]
+    return entry
+
+
+def _iter_jsonl(lines, errors):
+    """Parse JSON lines, collecting {"line", "error"} for bad ones instead of stopping."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield parse_entry(json.loads(line))
+        except ValueError as e:  # includes JSONDecodeError
+            errors.append({"line": number, "error": str(e)})
+
+
+def _insert(entries, errors):
+    """bulk_insert_entries, plus the counts /api/entries/bulk reports."""
+    counts = {"pending": 0}
+
+    def counted():
+        for entry in entries:
+            audio = entry.pop("audio", None)
+            if audio is not None:
+                entry["audio_filename"] = audio
+                if not entry.get("transcription") and entry.get("transcription_status") is None:
+                    counts["pending"] += 1
+            yield entry
+
+    report = bulk_insert_entries(counted())
+    report.update(inserted=len(report["ids"]), pending=counts["pending"], errors=errors)
+    print(f"[bulk] Imported {report['inserted']} entries in {report['seconds']:.2f}s "
+          f"({report['rows_per_second'] or 0:.0f} rows/s), {len(errors)} skipped")
+    return report
+
+
+def import_jsonl(lines):
+    """Import JSON lines (str or bytes). Returns the bulk_insert_entries report
+    plus inserted, pending and errors."""
+    errors = []
+
+    def resolved():
+        for entry in _iter_jsonl(lines, errors):
+            audio = entry.get("audio")
+            if audio is not None and (os.path.basename(audio) != audio
+                                      or not os.path.isfile(os.path.join(AUDIO_DIR, audio))):
+                errors.append({"audio": audio, "error": "not found in the audio directory"})
+                continue
+            yield entry
+
+    return _insert(resolved(), errors)
+
+
+def _unique_audio_name(name):
+    base, ext = os.path.splitext(os.path.basename(name))
+    candidate, n = base + ext.lower(), 1
+    while os.path.exists(os.path.join(AUDIO_DIR, candidate)):
+        candidate = f"{base}-{n}{ext.lower()}"
+        n += 1
+    return candidate
+
+
+def _wav_duration(path):
+    try:
+        with wave.open(path, "rb") as wf:
+            return round(wf.getnframes() / wf.getframerate(), 1)
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+def _copy_recordings(archive, members, names):
+    """Copy archive members into AUDIO_DIR. Returns {archive name: stored filename}.
+
+    Names are de-duplicated against what's already there (the Pi's own
+    recordings use the same timestamp scheme). If any copy fails, the ones
+    already made are removed again.
+    """
+    stored = {}
+    current = None
+    try:
+        for name in names:
+            current = _unique_audio_name(name)
+            part = os.path.join(AUDIO_DIR, current + ".part")
+            with archive.open(members[name]) as src, open(part, "wb") as dst:
+                shutil.copyfileobj(src, dst, 256 * 1024)
+            os.replace(part, os.path.join(AUDIO_DIR, current))
+            stored[name] = current
+            current = None
+    except BaseException:
+        leftovers = list(stored.values())
+        if current is not None:
+            leftovers += [current, current + ".part"]
+        for filename in leftovers:
+            try:
+                os.unlink(os.path.join(AUDIO_DIR, filename))
+            except OSError:
+                pass
+        raise
+    return stored
+
+
+def import_archive(fileobj):
+    """Import a zip of recordings (and optional entries.jsonl). Same report as import_jsonl.
+
+    Everything is parsed and checked before any audio is copied, so a bad
+    archive leaves nothing behind.
+    """
+    errors = []
+    with zipfile.ZipFile(fileobj) as archive:
+        members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+        recordings = {
+            name for name in members
+            if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS
+            # Finder's resource-fork stubs, not recordings
+            and not name.startswith("__MACOSX/")
+            and not os.path.basename(name).startswith("._")
+        }
+
+        entries = []
+        mentioned = set()
+        if MANIFEST in members:
+            with archive.open(members[MANIFEST]) as manifest:
+                for entry in _iter_jsonl(manifest, errors):
+                    audio = entry.get("audio")
+                    if audio is not None:
+                        if audio not in recordings:
+                            errors.append({"audio": audio, "error": "not in the archive"})
+                            continue
+                        mentioned.add(audio)
+                        entry.setdefault("created_at", created_from_filename(
+                            audio, datetime(*members[audio].date_time)))
+                    entries.append(entry)
+
+        unmentioned = []
+        for name in sorted(recordings - mentioned):
+            unmentioned.append({
+                "audio": name,
+                "created_at": created_from_filename(name, datetime(*members[name].date_time)),
+                "source": "import",
+            })
+        entries += unmentioned
+        now = datetime.now()
+        entries.sort(key=lambda e: e.get("created_at") or now)
+
+        stored = _copy_recordings(archive, members, sorted(recordings))
+
+    for entry in entries:
+        if entry.get("audio") is not None:
+            entry["audio"] = stored[entry["audio"]]
+    for entry in unmentioned:
+        if entry["audio"].endswith(".wav"):
+            entry["duration_seconds"] = _wav_duration(os.path.join(AUDIO_DIR, entry["audio"]))
+    return _insert(entries, errors)
+
+
+if __name__ == "__main__":
+    import sys
+    from db import init_db
+
+    if len(sys.argv) != 2:
+        print("Usage: python3 bulk_import.py <entries.jsonl | archive.zip>")
+        sys.exit(1)
+    init_db()
+    path = sys.argv[1]
+    if zipfile.is_zipfile(path):
+        with open(path, "rb") as f:
+            report = import_archive(f)
+    else:
+        with open(path, "rb") as f:
+            report = import_jsonl(f)
+    for error in report["errors"]:
+        print(f"  ! {error}")
+    if report["pending"]:
+        # Nothing to notify from here; murmur-services and remote workers
+        # check for due entries at least once a minute
+        print(f"{report['pending']} recordings pending transcription")
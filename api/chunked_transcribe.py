@@ -0,0 +1,55 @@
+"""Parallel Whisper transcription of long recordings.
+
+A 5-minute entry transcribed in one model.transcribe() call keeps a single
+core busy. Instead, the 16 kHz audio is cut at its quietest points into
+chunks of at most 30 s (Whisper's own window), the chunks are transcribed
+across a pool of processes that each hold a loaded model, and the text is
+joined back in order.
+
+Used by the remote worker, and by the Pi's local Whisper path when
+WHISPER_LOCAL_PROCESSES > 1.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from audio_preprocess import TARGET_RATE, split_on_silence
+
+# Set in each pool process by _load_model
+_model = None
+
+
+def _load_model(model_name, threads):
+    global _model
+    import torch
+    import whisper
+    # Split the cores between processes instead of every process
+    # spinning up a thread per core
+    torch.set_num_threads(threads)
+    _model = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(samples):
+    return _model.transcribe(samples).get("text", "").strip()
+
+
+class ChunkedTranscriber:
+    """Pool of Whisper processes for chunk-parallel transcription."""
+
+    def __init__(self, model_name, processes):
+        self.processes = processes
+        threads = max(1, (os.cpu_count() or 1) // processes)
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_load_model,
+            initargs=(model_name, threads),
+        )
+
+    def transcribe(self, samples):
+        """Transcribe 16 kHz mono float32 samples. Returns (text, chunk_count)."""
+        chunks = [samples[start:end] for start, end in split_on_silence(samples, TARGET_RATE)]
+        texts = self._pool.map(_transcribe_chunk, chunks)  # results come back in order
+        return " ".join(t for t in texts if t), len(chunks)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -4,20 +4,33 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "journal.db")
 AUDIO_DIR = os.path.join(BASE_DIR, "audio")
+WAV_CACHE_DIR = os.path.join(BASE_DIR, "wav-cache")  # ?format=wav decodes of FLAC/Opus recordings
 SETTINGS_PATH = os.path.join(BASE_DIR, "settings.json")
 FLASK_PORT = 5001
 FLASK_HOST = "0.0.0.0"  # accessible from other devices on network
+DB_STATEMENT_CACHE_SIZE = 128  # prepared statements kept per pooled connection
+BULK_INSERT_BATCH = 1000  # rows per transaction in db.bulk_insert_entries
 
 # Whisper settings
 WHISPER_MODEL = "tiny"  # tiny | base | small (tiny is fastest on Pi Zero 2)
+WHISPER_LOCAL_PROCESSES = 1  # >1 splits long local transcriptions across processes (RAM permitting)
 WHISPER_USE_CLOUD = True  # set True to use OpenAI API instead of local
 TRANSCRIBE_LOCALLY = True  # False = wait for remote worker (Mac Mini) to transcribe
+TRANSCRIBE_WORKERS = int(os.environ.get("MURMUR_TRANSCRIBE_WORKERS", "1"))  # concurrent jobs on the Pi
+JOB_LEASE_SECONDS = 300  # default lease for remote workers; renew with heartbeats
+LOCAL_JOB_LEASE_SECONDS = 900  # Pi's own jobs (sox + 300s upload timeout, no heartbeat)
+TRANSCRIBE_MAX_ATTEMPTS = 5  # failures before an entry is marked 'dead'
+RETRY_BASE_SECONDS = 60  # first retry delay; doubles per failed attempt
+RETRY_MAX_SECONDS = 6 * 3600  # cap on the retry delay
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 
 # Audio settings
 SAMPLE_RATE = 44100
 CHANNELS = 1
 AUDIO_FORMAT = "wav"
+AUDIO_STORAGE_CODEC = os.environ.get("MURMUR_AUDIO_CODEC", "flac")  # flac (lossless) | opus | wav (keep as received)
+OPUS_BITRATE_KBPS = 24  # plenty for 16 kHz speech
+WAV_CACHE_MAX_BYTES = 200 * 1024 * 1024  # oldest decodes are evicted past this
 
 # Ensure audio directory exists
 os.makedirs(AUDIO_DIR, exist_ok=True)
@@ -1,18 +1,101 @@
 import sqlite3
 import os
-from datetime import datetime, date
-from config import DB_PATH
+import re
+import threading
+import time
+from itertools import islice
+from datetime import datetime, date, timedelta
 
+from events import entry_events
+from config import (
+    DB_PATH, DB_STATEMENT_CACHE_SIZE, BULK_INSERT_BATCH,
+    TRANSCRIBE_MAX_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS,
+)
 
-def get_db():
-    """Get a database connection with row factory."""
-    conn = sqlite3.connect(DB_PATH)
+_local = threading.local()
+
+
+class _PooledConnection(sqlite3.Connection):
+    """Connection that survives close() so the thread can reuse it.
+
+    Helpers still call conn.close() when they're done; that just discards
+    any uncommitted work (same as a real close would) and leaves the
+    connection — and its prepared-statement cache — open for the next call.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def close_for_real(self):
+        super().close()
+
+
+def _connect(factory=sqlite3.Connection):
+    conn = sqlite3.connect(DB_PATH, factory=factory,
+                           cached_statements=DB_STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")  # better concurrent access
     conn.execute("PRAGMA foreign_keys=ON")
     return conn
 
 
+def get_db():
+    """Get this thread's database connection (opened on first use).
+
+    The connection is kept per thread and per process, so repeated helper
+    calls in one request skip the connect + PRAGMA cost and reuse
+    already-prepared statements.
+
+    A transaction left open by a helper that raised before committing is
+    rolled back here, so it can't hold SQLite's write lock (and its
+    half-done writes) until the thread's next commit.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = _connect(factory=_PooledConnection)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    elif conn.in_transaction:
+        conn.rollback()
+    return conn
+
+
+def rollback_db():
+    """Roll back whatever this thread's pooled connection left uncommitted."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid() and conn.in_transaction:
+        conn.rollback()
+
+
+def close_db():
+    """Close this thread's pooled connection, if any."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close_for_real()
+    _local.conn = None
+
+
+def _add_column(conn, table, column, decl):
+    """ALTER TABLE ... ADD COLUMN, unless the column already exists.
+
+    Returns True if the column was added.
+    """
+    columns = [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column in columns:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+# Tables whose writes change what the read endpoints return (see data_version)
+VERSIONED_TABLES = ("entries", "tags", "entry_tags", "milestones")
+
+
+def _codec_of(filename):
+    return os.path.splitext(filename)[1].lstrip(".").lower() or None
+
+
 def init_db():
     """Create tables if they don't exist."""
     conn = get_db()
@@ -58,11 +141,57 @@ def init_db():
             last_shown DATE
         );
 
+        -- Finished transcripts keyed by audio content, so identical audio
+        -- is never transcribed twice by the same backend + model.
+        CREATE TABLE IF NOT EXISTS transcription_cache (
+            audio_hash TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            model TEXT NOT NULL,
+            transcription TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (audio_hash, backend, model)
+        ) WITHOUT ROWID;
+
+        -- One row per entry currently leased to a transcriber (a remote
+        -- worker or the Pi itself). Times are unix epoch seconds.
+        CREATE TABLE IF NOT EXISTS transcription_jobs (
+            entry_id INTEGER PRIMARY KEY,
+            worker_id TEXT NOT NULL,
+            leased_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL,
+            lease_expires_at REAL NOT NULL,
+            FOREIGN KEY (entry_id) REFERENCES entries(id) ON DELETE CASCADE
+        );
+
         CREATE INDEX IF NOT EXISTS idx_entries_created ON entries(created_at);
         CREATE INDEX IF NOT EXISTS idx_entries_status ON entries(transcription_status);
-        CREATE INDEX IF NOT EXISTS idx_entries_favorite ON entries(is_favorite);
+        CREATE INDEX IF NOT EXISTS idx_entries_archived_created
+            ON entries(is_archived, created_at);
+        CREATE INDEX IF NOT EXISTS idx_entries_favorite_archived_created
+            ON entries(is_favorite, is_archived, created_at);
+        CREATE INDEX IF NOT EXISTS idx_entry_tags_tag ON entry_tags(tag_id, entry_id);
+        CREATE INDEX IF NOT EXISTS idx_entries_month_day
+            ON entries(strftime('%m-%d', created_at), created_at) WHERE is_archived = 0;
+
+        -- Superseded by idx_entries_favorite_archived_created
+        DROP INDEX IF EXISTS idx_entries_favorite;
     """)
 
+    # Columns added after the first release — migrate older databases in place
+    _add_column(conn, "entries", "attempts", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "entries", "last_error", "TEXT")
+    _add_column(conn, "entries", "next_attempt_at", "TIMESTAMP")
+    # Seconds of speech left after silence trimming (NULL until transcribed)
+    _add_column(conn, "entries", "speech_seconds", "REAL")
+    # How the recording is stored on disk (wav, flac, opus, webm, ...)
+    if _add_column(conn, "entries", "audio_codec", "TEXT"):
+        rows = conn.execute(
+            "SELECT id, audio_filename FROM entries WHERE audio_filename IS NOT NULL"
+        ).fetchall()
+        conn.executemany("UPDATE entries SET audio_codec = ? WHERE id = ?",
+                         [(_codec_of(r["audio_filename"]), r["id"]) for r in rows])
+
     # Seed some default prompts
     cursor = conn.execute("SELECT COUNT(*) FROM prompts")
     if cursor.fetchone()[0] == 0:
@@ -83,9 +212,185 @@ def init_db():
         conn.executemany("INSERT INTO prompts (text) VALUES (?)", [(p,) for p in prompts])
 
     conn.commit()
+
+    # Full-text index over transcription + notes, kept in sync by triggers.
+    # Databases created before the index existed get backfilled once.
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries_fts'"
+    ).fetchone()
+    conn.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+            transcription, notes,
+            content='entries', content_rowid='id',
+            tokenize='porter unicode61'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS entries_fts_ai AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts (rowid, transcription, notes)
+            VALUES (new.id, new.transcription, new.notes);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS entries_fts_ad AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, transcription, notes)
+            VALUES ('delete', old.id, old.transcription, old.notes);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS entries_fts_au
+        AFTER UPDATE OF transcription, notes ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, transcription, notes)
+            VALUES ('delete', old.id, old.transcription, old.notes);
+            INSERT INTO entries_fts (rowid, transcription, notes)
+            VALUES (new.id, new.transcription, new.notes);
+        END;
+    """)
+    if not has_fts:
+        conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+        conn.commit()
+
+    # Running totals for /api/stats and one row per day with live entries
+    # (for the streak), maintained by triggers instead of re-aggregated.
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_entries INTEGER NOT NULL DEFAULT 0,
+            total_favorites INTEGER NOT NULL DEFAULT 0,
+            total_duration_seconds REAL NOT NULL DEFAULT 0,
+            total_tags INTEGER NOT NULL DEFAULT 0,
+            total_milestones INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS activity_days (
+            day TEXT PRIMARY KEY,
+            entry_count INTEGER NOT NULL
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS stats_entries_ai AFTER INSERT ON entries BEGIN
+            UPDATE stats SET
+                total_entries = total_entries + (new.is_archived IS 0),
+                total_favorites = total_favorites + (new.is_favorite IS 1),
+                total_duration_seconds = total_duration_seconds
+                    + COALESCE(new.duration_seconds, 0)
+            WHERE id = 1;
+            INSERT INTO activity_days (day, entry_count)
+            SELECT date(new.created_at), 1
+            WHERE new.is_archived IS 0 AND date(new.created_at) IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET entry_count = entry_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_entries_ad AFTER DELETE ON entries BEGIN
+            UPDATE stats SET
+                total_entries = total_entries - (old.is_archived IS 0),
+                total_favorites = total_favorites - (old.is_favorite IS 1),
+                total_duration_seconds = total_duration_seconds
+                    - COALESCE(old.duration_seconds, 0)
+            WHERE id = 1;
+            UPDATE activity_days SET entry_count = entry_count - 1
+            WHERE old.is_archived IS 0 AND day = date(old.created_at);
+            DELETE FROM activity_days WHERE entry_count <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_entries_au
+        AFTER UPDATE OF is_archived, is_favorite, duration_seconds, created_at ON entries
+        BEGIN
+            UPDATE stats SET
+                total_entries = total_entries
+                    - (old.is_archived IS 0) + (new.is_archived IS 0),
+                total_favorites = total_favorites
+                    - (old.is_favorite IS 1) + (new.is_favorite IS 1),
+                total_duration_seconds = total_duration_seconds
+                    - COALESCE(old.duration_seconds, 0)
+                    + COALESCE(new.duration_seconds, 0)
+            WHERE id = 1;
+            UPDATE activity_days SET entry_count = entry_count - 1
+            WHERE old.is_archived IS 0 AND day = date(old.created_at);
+            DELETE FROM activity_days WHERE entry_count <= 0;
+            INSERT INTO activity_days (day, entry_count)
+            SELECT date(new.created_at), 1
+            WHERE new.is_archived IS 0 AND date(new.created_at) IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET entry_count = entry_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_tags_ai AFTER INSERT ON tags BEGIN
+            UPDATE stats SET total_tags = total_tags + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_tags_ad AFTER DELETE ON tags BEGIN
+            UPDATE stats SET total_tags = total_tags - 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_milestones_ai AFTER INSERT ON milestones BEGIN
+            UPDATE stats SET total_milestones = total_milestones + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_milestones_ad AFTER DELETE ON milestones BEGIN
+            UPDATE stats SET total_milestones = total_milestones - 1 WHERE id = 1;
+        END;
+    """)
+    if not conn.execute("SELECT 1 FROM stats WHERE id = 1").fetchone():
+        rebuild_stats(conn)
+
+    # Data version for ETags: bumped by a trigger on every write to the
+    # tables the read endpoints serve, whichever process makes it. It
+    # starts from the creation time (ms) so a replaced database can't
+    # repeat a version an old client still has cached.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    conn.execute(
+        """INSERT OR IGNORE INTO data_version (id, version)
+           VALUES (1, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER))"""
+    )
+    for table in VERSIONED_TABLES:
+        for action in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS version_{table}_{action.lower()}
+                AFTER {action} ON {table} BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+    conn.commit()
+
     conn.close()
 
 
+def get_data_version():
+    """Current data version (changes whenever entries, tags or milestones do)."""
+    conn = get_db()
+    row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    conn.close()
+    return row["version"] if row else 0
+
+
+def rebuild_stats(conn):
+    """Recompute the stats row and activity_days from scratch.
+
+    Only needed once for databases created before the summary tables
+    existed; after that the triggers keep both current.
+    """
+    conn.execute("DELETE FROM stats")
+    conn.execute("DELETE FROM activity_days")
+    conn.execute(
+        """INSERT INTO stats (id, total_entries, total_favorites,
+               total_duration_seconds, total_tags, total_milestones)
+           SELECT 1,
+               (SELECT COUNT(*) FROM entries WHERE is_archived = 0),
+               (SELECT COUNT(*) FROM entries WHERE is_favorite = 1),
+               (SELECT COALESCE(SUM(duration_seconds), 0) FROM entries),
+               (SELECT COUNT(*) FROM tags),
+               (SELECT COUNT(*) FROM milestones)"""
+    )
+    conn.execute(
+        """INSERT INTO activity_days (day, entry_count)
+           SELECT date(created_at), COUNT(*) FROM entries
+           WHERE is_archived = 0 AND date(created_at) IS NOT NULL
+           GROUP BY date(created_at)"""
+    )
+    conn.commit()
+
+
 # --- Entry helpers ---
 
 def create_entry(audio_filename=None, duration_seconds=None, notes=None, source="voice"):
@@ -93,17 +398,102 @@ def create_entry(audio_filename=None, duration_seconds=None, notes=None, source=
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     cursor = conn.execute(
         """INSERT INTO entries (created_at, updated_at, audio_filename, duration_seconds,
-           notes, source, transcription_status)
-           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+           notes, source, transcription_status, audio_codec)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
         (now, now, audio_filename, duration_seconds, notes, source,
-         "pending" if audio_filename else "none")
+         "pending" if audio_filename else "none",
+         _codec_of(audio_filename) if audio_filename else None)
     )
     entry_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    _publish_status(entry_id, "pending" if audio_filename else "none")
     return entry_id
 
 
+def bulk_insert_entries(entries, batch_size=BULK_INSERT_BATCH):
+    """Insert many entries, with their tags, committing once per batch.
+
+    `entries` is any iterable of dicts with optional created_at (string or
+    datetime), audio_filename, duration_seconds, transcription,
+    transcription_status, notes, source, is_favorite and tags. Rows go in
+    with executemany and each batch's tags are resolved in one pass, so
+    an import costs one fsync per `batch_size` rows instead of several per
+    row (create_entry + add_tag). Status events aren't published; callers
+    should notify job_events if they added pending entries.
+
+    Returns {"ids", "seconds", "rows_per_second"}.
+    """
+    start = time.monotonic()
+    ids = []
+    entries = iter(entries)
+    conn = get_db()
+    try:
+        while True:
+            batch = list(islice(entries, batch_size))
+            if not batch:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            ids.extend(_insert_entry_batch(conn, batch))
+            conn.commit()
+    finally:
+        conn.close()
+    seconds = time.monotonic() - start
+    return {
+        "ids": ids,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(len(ids) / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def _insert_entry_batch(conn, batch):
+    now = _now()
+    rows = []
+    for entry in batch:
+        created = entry.get("created_at") or now
+        if isinstance(created, datetime):
+            created = created.strftime("%Y-%m-%d %H:%M:%S")
+        audio = entry.get("audio_filename")
+        transcription = entry.get("transcription")
+        status = entry.get("transcription_status") or (
+            "done" if transcription else "pending" if audio else "none")
+        rows.append((created, created, audio, entry.get("duration_seconds"), transcription,
+                     status, entry.get("notes"), entry.get("source") or "voice",
+                     1 if entry.get("is_favorite") else 0,
+                     _codec_of(audio) if audio else None))
+    conn.executemany(
+        """INSERT INTO entries (created_at, updated_at, audio_filename, duration_seconds,
+           transcription, transcription_status, notes, source, is_favorite, audio_codec)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows
+    )
+    # We hold the write lock and ids are AUTOINCREMENT, so the batch got
+    # consecutive ids ending at the new maximum
+    last = conn.execute("SELECT MAX(id) FROM entries").fetchone()[0]
+    ids = list(range(last - len(rows) + 1, last + 1))
+
+    pairs = []
+    for entry_id, entry in zip(ids, batch):
+        for name in entry.get("tags") or ():
+            name = name.strip().lower()
+            if name:
+                pairs.append((entry_id, name))
+    if pairs:
+        names = sorted({name for _, name in pairs})
+        conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(n,) for n in names])
+        tag_ids = {}
+        for i in range(0, len(names), 500):  # stay under SQLite's variable limit
+            chunk = names[i:i + 500]
+            rows = conn.execute(
+                f"SELECT id, name FROM tags WHERE name IN ({', '.join('?' * len(chunk))})", chunk)
+            tag_ids.update((row["name"], row["id"]) for row in rows)
+        conn.executemany(
+            "INSERT OR IGNORE INTO entry_tags (entry_id, tag_id) VALUES (?, ?)",
+            [(entry_id, tag_ids[name]) for entry_id, name in pairs]
+        )
+    return ids
+
+
 def get_entry(entry_id):
     conn = get_db()
     entry = conn.execute(
@@ -118,42 +508,106 @@ def get_entry(entry_id):
     return entry, [t["name"] for t in tags]
 
 
-def get_entries(page=1, per_page=20, favorites_only=False, tag=None):
+def get_entry_status(entry_id):
+    """Just an entry's transcription_status (None if the entry doesn't exist)."""
     conn = get_db()
-    offset = (page - 1) * per_page
+    row = conn.execute(
+        "SELECT transcription_status FROM entries WHERE id = ?", (entry_id,)
+    ).fetchone()
+    conn.close()
+    return row["transcription_status"] if row else None
 
+
+def _entries_query(favorites_only=False, tag=None):
+    """Build the FROM/WHERE shared by the list and count queries for a filter.
+
+    Every filter is served by an index: (is_archived, created_at),
+    (is_favorite, is_archived, created_at), or tags.name ->
+    entry_tags(tag_id, entry_id) -> entries rowid.
+    """
+    tables = "entries e"
+    where = ["e.is_archived = 0"]
+    params = []
     if tag:
-        entries = conn.execute(
-            """SELECT e.* FROM entries e
-               JOIN entry_tags et ON e.id = et.entry_id
-               JOIN tags t ON t.id = et.tag_id
-               WHERE t.name = ? AND e.is_archived = 0
-               ORDER BY e.created_at DESC LIMIT ? OFFSET ?""",
-            (tag, per_page, offset)
-        ).fetchall()
+        # CROSS JOIN pins the join order so work scales with the tag's
+        # entries rather than the whole journal.
+        tables = """tags t
+               CROSS JOIN entry_tags et ON et.tag_id = t.id
+               CROSS JOIN entries e ON e.id = et.entry_id"""
+        where.append("t.name = ?")
+        params.append(tag)
     elif favorites_only:
-        entries = conn.execute(
-            """SELECT * FROM entries
-               WHERE is_favorite = 1 AND is_archived = 0
-               ORDER BY created_at DESC LIMIT ? OFFSET ?""",
-            (per_page, offset)
-        ).fetchall()
+        where.append("e.is_favorite = 1")
+    return f"FROM {tables} WHERE {' AND '.join(where)}", params
+
+
+def _entries_page_sql(page=1, per_page=20, favorites_only=False, tag=None, before=None):
+    from_sql, params = _entries_query(favorites_only=favorites_only, tag=tag)
+    if before:
+        from_sql += " AND (e.created_at, e.id) < (?, ?)"
+        params = params + list(before)
+        page_sql = "LIMIT ?"
+        params.append(per_page)
     else:
-        entries = conn.execute(
-            """SELECT * FROM entries WHERE is_archived = 0
-               ORDER BY created_at DESC LIMIT ? OFFSET ?""",
-            (per_page, offset)
-        ).fetchall()
+        page_sql = "LIMIT ? OFFSET ?"
+        params = params + [per_page, (page - 1) * per_page]
+    sql = f"SELECT e.* {from_sql} ORDER BY e.created_at DESC, e.id DESC {page_sql}"
+    return sql, params
 
-    total = conn.execute(
-        "SELECT COUNT(*) FROM entries WHERE is_archived = 0"
-    ).fetchone()[0]
+
+def get_entries(page=1, per_page=20, favorites_only=False, tag=None, before=None):
+    """List entries newest first. Returns (entries, total).
+
+    `total` counts the rows matching the active filter, not the whole journal.
+
+    `before` is a (created_at, id) cursor taken from the last row of the
+    previous page. When given, the query seeks straight past it on the
+    filter's created_at index (which ends in the rowid, i.e. id) instead
+    of skipping rows with OFFSET, and `page` is ignored.
+    """
+    conn = get_db()
+    sql, params = _entries_page_sql(page, per_page, favorites_only, tag, before)
+    entries = conn.execute(sql, params).fetchall()
+
+    from_sql, count_params = _entries_query(favorites_only=favorites_only, tag=tag)
+    total = conn.execute(f"SELECT COUNT(*) {from_sql}", count_params).fetchone()[0]
     conn.close()
     return entries, total
 
 
-def update_entry(entry_id, notes=None, transcription=None, transcription_status=None):
+def explain_list_queries():
+    """Return {label: [plan lines]} for every list/count query shape, plus a
+    list of labels whose plan falls back to a full table scan."""
     conn = get_db()
+    shapes = {
+        "all": {},
+        "favorites": {"favorites_only": True},
+        "tag": {"tag": "x"},
+    }
+    plans = {}
+    for label, filters in shapes.items():
+        from_sql, params = _entries_query(**filters)
+        queries = {
+            f"{label} count": (f"SELECT COUNT(*) {from_sql}", params),
+            f"{label} page": _entries_page_sql(**filters),
+            f"{label} cursor": _entries_page_sql(before=("9999", 0), **filters),
+        }
+        for name, (sql, qparams) in queries.items():
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", qparams).fetchall()
+            plans[name] = [row["detail"] for row in rows]
+    conn.close()
+    # "SCAN e" with no index is a table scan; "SCAN e USING ... INDEX" is an
+    # in-order index walk, which is what a LIMITed newest-first page wants.
+    table_scans = [
+        name for name, lines in plans.items()
+        if any(re.fullmatch(r"SCAN \w+", line) for line in lines)
+    ]
+    return plans, table_scans
+
+
+def _update_entry(conn, entry_id, notes=None, transcription=None, transcription_status=None,
+                  speech_seconds=None):
+    """UPDATE the given fields without committing. Returns False if there's no such entry."""
     fields = []
     values = []
     if notes is not None:
@@ -165,12 +619,52 @@ def update_entry(entry_id, notes=None, transcription=None, transcription_status=
     if transcription_status is not None:
         fields.append("transcription_status = ?")
         values.append(transcription_status)
-    if fields:
-        fields.append("updated_at = ?")
-        values.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        values.append(entry_id)
-        conn.execute(f"UPDATE entries SET {', '.join(fields)} WHERE id = ?", values)
-        conn.commit()
+    if speech_seconds is not None:
+        fields.append("speech_seconds = ?")
+        values.append(speech_seconds)
+    if not fields:
+        return True
+    fields.append("updated_at = ?")
+    values.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    values.append(entry_id)
+    cursor = conn.execute(f"UPDATE entries SET {', '.join(fields)} WHERE id = ?", values)
+    return cursor.rowcount == 1
+
+
+def update_entry(entry_id, notes=None, transcription=None, transcription_status=None,
+                 speech_seconds=None):
+    conn = get_db()
+    _update_entry(conn, entry_id, notes, transcription, transcription_status, speech_seconds)
+    conn.commit()
+    conn.close()
+    if transcription_status is not None:
+        _publish_status(entry_id, transcription_status)
+
+
+def get_wav_entries():
+    """Entries whose recording is still stored as WAV (for audio_storage --migrate).
+
+    `leased` is 1 while a worker holds a transcription lease on the entry.
+    """
+    conn = get_db()
+    rows = conn.execute(
+        """SELECT id, audio_filename, transcription_status,
+                  EXISTS (SELECT 1 FROM transcription_jobs j WHERE j.entry_id = entries.id)
+                      AS leased
+           FROM entries WHERE audio_codec = 'wav' ORDER BY id"""
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def set_entry_audio(entry_id, audio_filename, audio_codec):
+    """Point an entry at a re-encoded copy of its recording."""
+    conn = get_db()
+    conn.execute(
+        "UPDATE entries SET audio_filename = ?, audio_codec = ? WHERE id = ?",
+        (audio_filename, audio_codec, entry_id)
+    )
+    conn.commit()
     conn.close()
 
 
@@ -191,28 +685,63 @@ def toggle_favorite(entry_id):
     conn.close()
 
 
-def search_entries(query):
+def _fts_query(query):
+    """Turn free text into a safe FTS5 query: every word, prefix-matched."""
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search_entries(query, page=1, per_page=20):
+    """Ranked full-text search. Returns (entries, total); each entry has a
+    `snippet` with matches wrapped in <mark>...</mark>."""
+    match = _fts_query(query)
+    if not match:
+        return [], 0
     conn = get_db()
-    like = f"%{query}%"
+    offset = (page - 1) * per_page
     entries = conn.execute(
-        """SELECT * FROM entries
-           WHERE (transcription LIKE ? OR notes LIKE ?) AND is_archived = 0
-           ORDER BY created_at DESC""",
-        (like, like)
+        """SELECT e.*,
+                  snippet(entries_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+           FROM entries_fts
+           JOIN entries e ON e.id = entries_fts.rowid
+           WHERE entries_fts MATCH ? AND e.is_archived = 0
+           ORDER BY entries_fts.rank LIMIT ? OFFSET ?""",
+        (match, per_page, offset)
     ).fetchall()
+    total = conn.execute(
+        """SELECT COUNT(*) FROM entries_fts
+           JOIN entries e ON e.id = entries_fts.rowid
+           WHERE entries_fts MATCH ? AND e.is_archived = 0""",
+        (match,)
+    ).fetchone()[0]
     conn.close()
-    return entries
+    return entries, total
 
 
-def get_on_this_day():
-    """Get entries from this day in previous months/years."""
+def get_on_this_day(month_day=None, window=0):
+    """Get entries from this day in previous months/years.
+
+    `month_day` is "MM-DD" (defaults to today); `window` widens the match to
+    that many days either side. The WHERE clause repeats the expression of
+    idx_entries_month_day exactly, and INDEXED BY stops the planner from
+    preferring a full created_at walk just to skip the sort.
+    """
+    if month_day is None:
+        month_day = date.today().strftime("%m-%d")
+    # 2000 is a leap year, so 02-29 is a valid anchor
+    anchor = datetime.strptime(f"2000-{month_day}", "%Y-%m-%d").date()
+    days = sorted({
+        (anchor + timedelta(days=offset)).strftime("%m-%d")
+        for offset in range(-window, window + 1)
+    })
+
     conn = get_db()
-    today = date.today()
+    placeholders = ", ".join("?" for _ in days)
     entries = conn.execute(
-        """SELECT * FROM entries
-           WHERE strftime('%m-%d', created_at) = ? AND is_archived = 0
+        f"""SELECT * FROM entries INDEXED BY idx_entries_month_day
+           WHERE strftime('%m-%d', created_at) IN ({placeholders}) AND is_archived = 0
            ORDER BY created_at ASC""",
-        (today.strftime("%m-%d"),)
+        days
     ).fetchall()
     conn.close()
     return entries
@@ -281,61 +810,362 @@ def get_milestones():
 
 def get_stats():
     conn = get_db()
-    stats = {}
-    stats["total_entries"] = conn.execute(
-        "SELECT COUNT(*) FROM entries WHERE is_archived = 0"
-    ).fetchone()[0]
-    stats["total_favorites"] = conn.execute(
-        "SELECT COUNT(*) FROM entries WHERE is_favorite = 1"
-    ).fetchone()[0]
-    stats["total_duration_seconds"] = conn.execute(
-        "SELECT COALESCE(SUM(duration_seconds), 0) FROM entries"
-    ).fetchone()[0]
-    stats["total_tags"] = conn.execute(
-        "SELECT COUNT(*) FROM tags"
-    ).fetchone()[0]
-    stats["total_milestones"] = conn.execute(
-        "SELECT COUNT(*) FROM milestones"
-    ).fetchone()[0]
+    stats = dict(conn.execute(
+        """SELECT total_entries, total_favorites, total_duration_seconds,
+                  total_tags, total_milestones
+           FROM stats WHERE id = 1"""
+    ).fetchone())
 
-    # Streak: consecutive days with entries
-    days = conn.execute(
-        """SELECT DISTINCT date(created_at) as day FROM entries
-           WHERE is_archived = 0 ORDER BY day DESC"""
-    ).fetchall()
+    # Streak: consecutive days with entries. Rows are read lazily, newest
+    # first, so this stops at the first gap instead of loading every day.
+    days = conn.execute("SELECT day FROM activity_days ORDER BY day DESC")
     streak = 0
-    if days:
-        from datetime import timedelta
-        check = date.today()
-        for row in days:
-            day = date.fromisoformat(row["day"])
-            if day == check:
-                streak += 1
-                check -= timedelta(days=1)
-            elif day == check - timedelta(days=1):
-                streak += 1
-                check = day - timedelta(days=1)
-            else:
-                break
+    check = date.today()
+    for row in days:
+        day = date.fromisoformat(row["day"])
+        if day == check:
+            streak += 1
+            check -= timedelta(days=1)
+        elif day == check - timedelta(days=1):
+            streak += 1
+            check = day - timedelta(days=1)
+        else:
+            break
+    days.close()
     stats["streak"] = streak
     conn.close()
     return stats
 
 
-def get_untranscribed_entries():
-    """Get entries waiting for remote transcription (includes failed for retry)."""
+def get_untranscribed_entries(due_only=False):
+    """Get entries waiting for remote transcription (includes failed for retry).
+
+    With due_only, skip entries whose retry backoff hasn't elapsed yet.
+    Entries that ran out of attempts ('dead') are never returned.
+    """
     conn = get_db()
+    due_sql = "AND (next_attempt_at IS NULL OR next_attempt_at <= ?)" if due_only else ""
+    params = (_now(),) if due_only else ()
     entries = conn.execute(
-        """SELECT id, audio_filename, duration_seconds, created_at
+        f"""SELECT id, audio_filename, duration_seconds, created_at, attempts
            FROM entries
            WHERE transcription_status IN ('pending', 'failed')
-             AND audio_filename IS NOT NULL
-           ORDER BY created_at ASC"""
+             AND audio_filename IS NOT NULL {due_sql}
+           ORDER BY created_at ASC""",
+        params
     ).fetchall()
     conn.close()
     return entries
 
 
+def get_next_retry_delay():
+    """Seconds until the next backed-off entry is due for a retry, or None."""
+    conn = get_db()
+    row = conn.execute(
+        """SELECT MIN(next_attempt_at) AS next_at FROM entries
+           WHERE transcription_status IN ('pending', 'failed')
+             AND next_attempt_at IS NOT NULL"""
+    ).fetchone()
+    conn.close()
+    if row["next_at"] is None:
+        return None
+    next_at = datetime.strptime(row["next_at"], "%Y-%m-%d %H:%M:%S")
+    return max((next_at - datetime.now()).total_seconds(), 0)
+
+
+def _now(offset_seconds=0):
+    return (datetime.now() + timedelta(seconds=offset_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _publish_status(entry_id, status):
+    """Tell /api/events listeners about a committed status change."""
+    entry_events.publish({"id": entry_id, "transcription_status": status})
+
+
+def _record_failure(conn, entry_id, error, count_attempt):
+    row = conn.execute("SELECT attempts FROM entries WHERE id = ?", (entry_id,)).fetchone()
+    if row is None:
+        return None
+    attempts = row["attempts"] + (1 if count_attempt else 0)
+    if count_attempt and attempts >= TRANSCRIBE_MAX_ATTEMPTS:
+        status, next_attempt_at = "dead", None
+    else:
+        delay = min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+        # Transient failures stay 'pending', real failures become 'failed'
+        status = "failed" if count_attempt else "pending"
+        next_attempt_at = _now(delay)
+    conn.execute(
+        """UPDATE entries SET transcription_status = ?, attempts = ?, last_error = ?,
+               next_attempt_at = ?, updated_at = ?
+           WHERE id = ?""",
+        (status, attempts, (error or "")[:500], next_attempt_at, _now(), entry_id)
+    )
+    return status
+
+
+def record_transcription_failure(entry_id, error=None, count_attempt=True):
+    """Record a failed transcription and schedule the next try.
+
+    Retries back off exponentially from RETRY_BASE_SECONDS up to
+    RETRY_MAX_SECONDS. After TRANSCRIBE_MAX_ATTEMPTS counted failures the
+    entry moves to the terminal 'dead' status. Pass count_attempt=False for
+    transient problems (network down) that shouldn't use up attempts.
+    Returns the entry's new status.
+    """
+    conn = get_db()
+    status = _record_failure(conn, entry_id, error, count_attempt)
+    conn.commit()
+    conn.close()
+    if status is not None:
+        _publish_status(entry_id, status)
+    return status
+
+
+def reset_transcription_retries(entry_id):
+    """Make an entry pending again with a fresh attempt budget (manual retry)."""
+    conn = get_db()
+    conn.execute(
+        """UPDATE entries SET transcription_status = 'pending', attempts = 0,
+               last_error = NULL, next_attempt_at = NULL, updated_at = ?
+           WHERE id = ?""",
+        (_now(), entry_id)
+    )
+    conn.commit()
+    conn.close()
+    _publish_status(entry_id, "pending")
+
+
+# --- Transcription cache ---
+
+def get_cached_transcription(audio_hash, backend, model):
+    """Return the cached transcript for this audio, or None. Counts the hit."""
+    conn = get_db()
+    row = conn.execute(
+        """SELECT transcription FROM transcription_cache
+           WHERE audio_hash = ? AND backend = ? AND model = ?""",
+        (audio_hash, backend, model)
+    ).fetchone()
+    if row:
+        conn.execute(
+            """UPDATE transcription_cache SET hits = hits + 1
+               WHERE audio_hash = ? AND backend = ? AND model = ?""",
+            (audio_hash, backend, model)
+        )
+        conn.commit()
+    conn.close()
+    return row["transcription"] if row else None
+
+
+def store_cached_transcription(audio_hash, backend, model, transcription):
+    conn = get_db()
+    conn.execute(
+        """INSERT OR REPLACE INTO transcription_cache
+           (audio_hash, backend, model, transcription, created_at)
+           VALUES (?, ?, ?, ?, ?)""",
+        (audio_hash, backend, model, transcription, _now())
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_transcription_cache_stats():
+    """Each cached row was one miss (a real transcription); hits are reuses."""
+    conn = get_db()
+    row = conn.execute(
+        "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM transcription_cache"
+    ).fetchone()
+    conn.close()
+    lookups = row["entries"] + row["hits"]
+    return {
+        "entries": row["entries"],
+        "hits": row["hits"],
+        "misses": row["entries"],
+        "hit_rate": round(row["hits"] / lookups, 3) if lookups else 0,
+    }
+
+
+# --- Transcription job leases ---
+#
+# A transcriber must hold an entry's lease before working on it, so several
+# remote workers and the Pi's own queue never transcribe the same file.
+# Leases that stop getting heartbeats expire and the entry becomes
+# claimable again.
+
+def _expire_leases(conn, now):
+    conn.execute("DELETE FROM transcription_jobs WHERE lease_expires_at < ?", (now,))
+
+
+def claim_transcription_jobs(worker_id, limit=1, lease_seconds=300):
+    """Atomically lease up to `limit` of the oldest untranscribed entries."""
+    conn = get_db()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")  # take the write lock before choosing rows
+    try:
+        _expire_leases(conn, now)
+        entries = conn.execute(
+            """SELECT id, audio_filename, duration_seconds, created_at
+               FROM entries e
+               WHERE transcription_status IN ('pending', 'failed')
+                 AND audio_filename IS NOT NULL
+                 AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                 AND NOT EXISTS (
+                     SELECT 1 FROM transcription_jobs j WHERE j.entry_id = e.id)
+               ORDER BY created_at ASC LIMIT ?""",
+            (_now(), limit)
+        ).fetchall()
+        conn.executemany(
+            """INSERT INTO transcription_jobs
+               (entry_id, worker_id, leased_at, heartbeat_at, lease_expires_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            [(e["id"], worker_id, now, now, now + lease_seconds) for e in entries]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return entries, now + lease_seconds
+
+
+def lease_entry(entry_id, worker_id, lease_seconds=300):
+    """Try to lease one specific entry that still needs transcribing.
+
+    Returns True if `worker_id` now holds it.
+    """
+    conn = get_db()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _expire_leases(conn, now)
+        cursor = conn.execute(
+            """INSERT OR IGNORE INTO transcription_jobs
+               (entry_id, worker_id, leased_at, heartbeat_at, lease_expires_at)
+               SELECT id, ?, ?, ?, ? FROM entries
+               WHERE id = ? AND transcription_status IN ('pending', 'failed')""",
+            (worker_id, now, now, now + lease_seconds, entry_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return cursor.rowcount == 1
+
+
+def heartbeat_transcription_job(entry_id, worker_id, lease_seconds=300):
+    """Extend a lease. Returns False if the worker no longer holds it."""
+    conn = get_db()
+    now = time.time()
+    cursor = conn.execute(
+        """UPDATE transcription_jobs SET heartbeat_at = ?, lease_expires_at = ?
+           WHERE entry_id = ? AND worker_id = ?""",
+        (now, now + lease_seconds, entry_id, worker_id)
+    )
+    conn.commit()
+    conn.close()
+    return cursor.rowcount == 1
+
+
+def _complete_job(conn, entry_id, worker_id, transcription=None, transcription_status="done",
+                  error=None, speech_seconds=None):
+    """Drop a lease and write its result, without committing.
+
+    Returns the entry's new status, or None if the worker doesn't hold the
+    lease (nothing is changed then).
+    """
+    cursor = conn.execute(
+        "DELETE FROM transcription_jobs WHERE entry_id = ? AND worker_id = ?",
+        (entry_id, worker_id)
+    )
+    if cursor.rowcount != 1:
+        return None
+    if transcription_status == "failed":
+        return _record_failure(conn, entry_id, error, count_attempt=True)
+    fields = ["transcription_status = ?", "updated_at = ?", "next_attempt_at = NULL"]
+    values = [transcription_status, datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+    if transcription is not None:
+        fields.append("transcription = ?")
+        values.append(transcription)
+    if speech_seconds is not None:
+        fields.append("speech_seconds = ?")
+        values.append(speech_seconds)
+    conn.execute(f"UPDATE entries SET {', '.join(fields)} WHERE id = ?",
+                 values + [entry_id])
+    return transcription_status
+
+
+def complete_transcription_job(entry_id, worker_id, transcription=None,
+                               transcription_status="done", error=None,
+                               speech_seconds=None):
+    """Write a leased entry's result and drop the lease in one transaction.
+
+    A "failed" result goes through the same attempt/backoff accounting as
+    failures on the Pi. Returns False, without touching the entry, if the
+    worker no longer holds the lease (it expired and someone else claimed it).
+    """
+    conn = get_db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        status = _complete_job(conn, entry_id, worker_id, transcription,
+                               transcription_status, error, speech_seconds)
+        if status is None:
+            conn.rollback()
+            return False
+        conn.commit()
+        _publish_status(entry_id, status)
+        return True
+    finally:
+        conn.close()
+
+
+def apply_transcription_results(results, worker_id=None):
+    """Apply many transcription results in one transaction (one fsync).
+
+    Each result is a dict with "id" and any of "transcription",
+    "transcription_status", "speech_seconds" and "error". With a worker_id
+    each one completes that worker's lease like complete_transcription_job;
+    without, it's a plain update like update_entry. Returns a list of
+    booleans in the same order: False where the lease wasn't held or the
+    entry doesn't exist.
+    """
+    conn = get_db()
+    conn.execute("BEGIN IMMEDIATE")
+    applied = []
+    published = []
+    try:
+        for result in results:
+            entry_id = result["id"]
+            status = result.get("transcription_status")
+            if worker_id:
+                status = _complete_job(conn, entry_id, worker_id,
+                                       transcription=result.get("transcription"),
+                                       transcription_status=status or "done",
+                                       error=result.get("error"),
+                                       speech_seconds=result.get("speech_seconds"))
+                ok = status is not None
+            else:
+                ok = _update_entry(conn, entry_id,
+                                   transcription=result.get("transcription"),
+                                   transcription_status=status,
+                                   speech_seconds=result.get("speech_seconds"))
+            applied.append(ok)
+            if ok and status is not None:
+                published.append((entry_id, status))
+        conn.commit()
+    finally:
+        conn.close()
+    for entry_id, status in published:
+        _publish_status(entry_id, status)
+    return applied
+
+
+def release_transcription_job(entry_id, worker_id):
+    """Give a lease back without changing the entry."""
+    conn = get_db()
+    conn.execute(
+        "DELETE FROM transcription_jobs WHERE entry_id = ? AND worker_id = ?",
+        (entry_id, worker_id)
+    )
+    conn.commit()
+    conn.close()
+
+
 def get_random_prompt():
     conn = get_db()
     prompt = conn.execute(
@@ -345,6 +1175,46 @@ def get_random_prompt():
     return prompt
 
 
+def benchmark_connections(iterations=500):
+    """Time get_entry()-style lookups with fresh vs pooled connections.
+
+    Returns average milliseconds per call for each mode.
+    """
+    query = "SELECT * FROM entries WHERE id = ?"
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        conn = _connect()
+        conn.execute(query, (i,)).fetchone()
+        conn.close()
+    fresh = (time.perf_counter() - start) * 1000 / iterations
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        conn = get_db()
+        conn.execute(query, (i,)).fetchone()
+        conn.close()
+    pooled = (time.perf_counter() - start) * 1000 / iterations
+
+    return {"fresh_ms": fresh, "pooled_ms": pooled}
+
+
 if __name__ == "__main__":
+    import sys
     init_db()
     print(f"Database initialized at {DB_PATH}")
+    if "--explain" in sys.argv:
+        plans, table_scans = explain_list_queries()
+        for name, lines in plans.items():
+            print(f"  {name}:")
+            for line in lines:
+                print(f"    {line}")
+        if table_scans:
+            print(f"Table scans in: {', '.join(table_scans)}")
+            sys.exit(1)
+        print("No list query falls back to a table scan.")
+    if "--bench" in sys.argv:
+        result = benchmark_connections()
+        print(f"  fresh connection:  {result['fresh_ms']:.3f} ms/query")
+        print(f"  pooled connection: {result['pooled_ms']:.3f} ms/query")
+        print(f"  saved per call:    {result['fresh_ms'] - result['pooled_ms']:.3f} ms")
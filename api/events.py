@@ -0,0 +1,139 @@
+"""Change notifications for long-polling and SSE clients.
+
+A Notifier is a version counter plus a condition variable. Writers call
+notify() after committing a change; waiters block in wait(since) until the
+version moves past the one they last saw, or the timeout passes. Waiters
+only need to remember a number, so a client that reconnects after a gap
+(or after the API restarted and the counter reset) just gets woken at once.
+
+In production the web server and the background services (services.py)
+are separate processes. After listen(role), every notify()/publish() is
+also forwarded to the other role over a Unix datagram socket, so an upload
+handled by the web process wakes the transcription queue, and a status
+change made by the queue reaches the web process's SSE streams. Without
+listen() (the dev server runs everything in one process) nothing leaves
+the process.
+"""
+
+import json
+import socket
+import threading
+from collections import deque
+
+# Linux abstract socket names (no files to clean up), one per process role
+SOCKETS = {"web": "\0murmur-events-web", "services": "\0murmur-events-services"}
+
+_channels = {}
+_relay = {"sock": None, "peers": ()}
+
+
+def _forward(channel, event=None):
+    sock = _relay["sock"]
+    if sock is None:
+        return
+    data = json.dumps({"channel": channel, "event": event}).encode()
+    for peer in _relay["peers"]:
+        try:
+            sock.sendto(data, peer)
+        except OSError:
+            pass  # peer not running; it catches up from the database on start
+
+
+class Notifier:
+    def __init__(self, channel):
+        self.channel = channel
+        self._cond = threading.Condition()
+        self.version = 0
+        _channels[channel] = self
+
+    def notify(self):
+        version = self._notify_local()
+        _forward(self.channel)
+        return version
+
+    def _notify_local(self):
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+            return self.version
+
+    def _receive(self, event):
+        self._notify_local()
+
+    def wait(self, since, timeout):
+        """Block until the version differs from `since`; returns the current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != since, timeout)
+            return self.version
+
+
+class EventLog(Notifier):
+    """Notifier that also keeps the last `size` events so waiters can catch up."""
+
+    def __init__(self, channel, size=256):
+        super().__init__(channel)
+        self._events = deque(maxlen=size)
+
+    def publish(self, event):
+        version = self._publish_local(event)
+        _forward(self.channel, event)
+        return version
+
+    def _publish_local(self, event):
+        with self._cond:
+            self.version += 1
+            self._events.append((self.version, event))
+            self._cond.notify_all()
+            return self.version
+
+    def _receive(self, event):
+        self._publish_local(event)
+
+    def read(self, since, timeout):
+        """Wait for events after version `since`.
+
+        Returns (version, events, complete); complete is False when some
+        events after `since` have already dropped out of the buffer (or the
+        counter restarted), so the caller should re-read current state.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != since, timeout)
+            events = [event for v, event in self._events if v > since]
+            oldest = self._events[0][0] if self._events else self.version + 1
+            complete = since <= self.version and oldest <= since + 1
+            return self.version, events, complete
+
+
+def listen(role):
+    """Join the cross-process relay as `role` ("web" or "services").
+
+    Returns False (and stays process-local) if the socket can't be bound,
+    e.g. on a system without abstract Unix sockets.
+    """
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(SOCKETS[role])
+    except OSError as e:
+        print(f"[events] Cross-process events unavailable ({e}); staying in-process")
+        return False
+    _relay["sock"] = sock
+    _relay["peers"] = tuple(addr for name, addr in SOCKETS.items() if name != role)
+    threading.Thread(target=_receive_loop, args=(sock,), daemon=True,
+                     name="events-relay").start()
+    return True
+
+
+def _receive_loop(sock):
+    while True:
+        try:
+            message = json.loads(sock.recv(65536))
+            _channels[message["channel"]]._receive(message["event"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[events] Dropped relay message: {e}")
+
+
+# An entry became claimable: new recording, manual retry or released lease
+job_events = Notifier("jobs")
+
+# An entry's transcription_status changed (including new entries)
+entry_events = EventLog("entries")
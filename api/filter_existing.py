@@ -11,6 +11,11 @@ import os
 import shutil
 import subprocess
 
+try:
+    import audio_preprocess
+except ImportError:
+    audio_preprocess = None
+
 AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio")
 BACKUP_DIR = os.path.join(AUDIO_DIR, "originals")
 NOISE_PROF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "noise.prof")
@@ -19,6 +24,21 @@ NOISE_PROF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "noise.pro
 def filter_file(filepath):
     """Apply noisered + notch filters to a single audio file."""
     tmp = filepath + ".filtered.wav"
+    if audio_preprocess is not None:
+        try:
+            noise_prof = NOISE_PROF if os.path.exists(NOISE_PROF) else None
+            samples = audio_preprocess.preprocess(filepath, noise_profile=noise_prof)
+            audio_preprocess.write_wav(tmp, samples)
+            os.replace(tmp, filepath)
+            return True
+        except ValueError:
+            pass  # not a WAV — let sox decode it
+        except Exception as e:
+            print(f"  FAILED: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+
     cmd = ["sox", filepath, tmp, "rate", "16000", "channels", "1"]
     if os.path.exists(NOISE_PROF):
         cmd += ["noisered", NOISE_PROF, "0.05"]
@@ -0,0 +1,27 @@
+"""gunicorn settings for the Murmur API on the Pi.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+One process with a pool of threads: SQLite takes one writer at a time
+anyway, a Pi Zero 2 has 512 MB for every Python process, and SSE streams
+and worker long-polls (/api/events, /api/jobs/wait) are fanned out in
+memory, so they have to share a process with the handlers that publish.
+Each open stream or long-poll holds a thread, hence the generous pool
+(app.py caps the streams at SSE_MAX_STREAMS, and long-polls at
+JOB_WAIT_MAX_SECONDS each).
+"""
+
+import os
+
+from config import FLASK_HOST, FLASK_PORT
+
+bind = f"{FLASK_HOST}:{FLASK_PORT}"
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("MURMUR_WEB_THREADS", "16"))
+keepalive = 30  # workers and the recorder reuse connections
+timeout = 120  # worker heartbeat, not a request limit, under gthread
+graceful_timeout = 10
+sendfile = True  # /api/audio on :5001 goes out via sendfile(2)
+accesslog = None
+errorlog = "-"
@@ -0,0 +1,126 @@
+"""Bounded in-process queue for transcription jobs.
+
+Every transcription on the Pi (fresh uploads, manual retries and the
+auto-retry loop) goes through one queue served by a fixed number of worker
+threads, so a burst of uploads can't start N sox + Whisper jobs at once.
+"""
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+
+from config import TRANSCRIBE_WORKERS, LOCAL_JOB_LEASE_SECONDS
+from db import lease_entry, release_transcription_job
+from transcribe import transcribe_entry
+
+# Lease holder name for jobs the Pi runs itself (see transcription_jobs)
+LOCAL_WORKER_ID = "pi-local"
+
+# Lower runs first
+PRIORITY_UPLOAD = 0
+PRIORITY_RETRY = 1
+
+
+class TranscriptionQueue:
+    """Priority queue of transcription jobs, de-duplicated by entry id."""
+
+    def __init__(self, handler, workers=1):
+        self._handler = handler
+        self._workers = workers
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()  # FIFO within a priority
+        self._lock = threading.Lock()
+        self._active = set()  # entry ids queued or running
+        self._threads = []
+
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def submit(self, entry_id, filepath, priority=PRIORITY_RETRY, **kwargs):
+        """Queue an entry for transcription.
+
+        Returns False (and does nothing) if the entry is already queued or
+        being transcribed.
+        """
+        with self._lock:
+            if entry_id in self._active:
+                return False
+            self._active.add(entry_id)
+            self._start_workers()
+        self._queue.put((priority, next(self._seq), time.monotonic(),
+                         entry_id, filepath, kwargs))
+        return True
+
+    def is_active(self, entry_id):
+        with self._lock:
+            return entry_id in self._active
+
+    def metrics(self):
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "workers": self._workers,
+                "depth": self._queue.qsize(),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_seconds": round(self._total_wait / finished, 2) if finished else 0,
+                "max_wait_seconds": round(self._max_wait, 2),
+            }
+
+    def _start_workers(self):
+        # Called with self._lock held. Workers start on first use so
+        # importing this module has no side effects.
+        while len(self._threads) < self._workers:
+            t = threading.Thread(target=self._worker_loop, daemon=True,
+                                 name=f"transcribe-{len(self._threads)}")
+            t.start()
+            self._threads.append(t)
+
+    def _worker_loop(self):
+        while True:
+            priority, _, queued_at, entry_id, filepath, kwargs = self._queue.get()
+            wait = time.monotonic() - queued_at
+            with self._lock:
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            ok = False
+            try:
+                self._handler(entry_id, filepath, **kwargs)
+                ok = True
+            except Exception:
+                traceback.print_exc()
+                print(f"[jobs] Entry {entry_id} job crashed")
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._active.discard(entry_id)
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                self._queue.task_done()
+
+
+def _transcribe_leased(entry_id, filepath, **kwargs):
+    """Run transcribe_entry while holding the entry's lease.
+
+    Skips the entry if a remote worker already holds it or it no longer
+    needs transcribing.
+    """
+    if not lease_entry(entry_id, LOCAL_WORKER_ID, LOCAL_JOB_LEASE_SECONDS):
+        print(f"[jobs] Entry {entry_id} is leased elsewhere or already done, skipping")
+        return
+    try:
+        transcribe_entry(entry_id, filepath, **kwargs)
+    finally:
+        release_transcription_job(entry_id, LOCAL_WORKER_ID)
+
+
+transcription_queue = TranscriptionQueue(_transcribe_leased, workers=TRANSCRIBE_WORKERS)
@@ -8,11 +8,10 @@ import os
 from datetime import datetime
 
 from config import AUDIO_DIR, get_persisted_setting, OPENAI_API_KEY
-from db import init_db, get_db
+from db import init_db, get_db, bulk_insert_entries
+from bulk_import import AUDIO_EXTENSIONS, created_from_filename
 from transcribe import transcribe_entry
 
-EXTENSIONS = (".wav", ".mp3", ".webm", ".m4a")
-
 
 def recover():
     init_db()
@@ -25,45 +24,41 @@ def recover():
 
     files = sorted(
         f for f in os.listdir(AUDIO_DIR)
-        if os.path.splitext(f)[1].lower() in EXTENSIONS
+        if os.path.splitext(f)[1].lower() in AUDIO_EXTENSIONS
     )
 
-    added = 0
+    rows = []
     for fname in files:
         if fname in tracked:
             continue
 
-        # Parse timestamp from filename like 2025-03-01_143022.wav
-        basename = os.path.splitext(fname)[0]
-        try:
-            created = datetime.strptime(basename, "%Y-%m-%d_%H%M%S")
-        except ValueError:
-            created = datetime.fromtimestamp(
-                os.path.getmtime(os.path.join(AUDIO_DIR, fname))
-            )
-
+        # Timestamp from a filename like 2025-03-01_143022.wav, else the mtime
         filepath = os.path.join(AUDIO_DIR, fname)
+        created = created_from_filename(
+            fname, datetime.fromtimestamp(os.path.getmtime(filepath)))
         size = os.path.getsize(filepath)
-        # Rough duration estimate: ~16KB/s for 16kHz mono WAV
-        duration = round(size / 16000, 1) if size > 0 else None
-
-        conn.execute(
-            """INSERT INTO entries (audio_filename, duration_seconds, source,
-               transcription_status, created_at, updated_at)
-               VALUES (?, ?, 'button', 'pending', ?, ?)""",
-            (fname, duration, created.isoformat(), created.isoformat()),
-        )
-        added += 1
+        ext = os.path.splitext(fname)[1].lower()
+        # Rough duration estimate: ~16KB/s for 16kHz mono WAV (unknown once compressed)
+        duration = round(size / 16000, 1) if size > 0 and ext == ".wav" else None
+
+        rows.append({
+            "audio_filename": fname,
+            "duration_seconds": duration,
+            "source": "button",
+            "transcription_status": "pending",
+            "created_at": created,
+        })
         print(f"  + {fname}  ({created.strftime('%b %d %H:%M')})")
 
-    conn.commit()
-
-    if added == 0:
+    if not rows:
         print("No orphaned audio files found — database is up to date.")
         conn.close()
         return
 
-    print(f"\nRecovered {added} entries.")
+    report = bulk_insert_entries(rows)
+    added = len(report["ids"])
+    print(f"\nRecovered {added} entries in {report['seconds']:.2f}s "
+          f"({report['rows_per_second'] or 0:.0f} rows/s).")
 
     # Kick off transcription for all pending entries
     api_key = get_persisted_setting("openai_api_key") or OPENAI_API_KEY
@@ -1,5 +1,5 @@
 """Seed the database with sample entries for testing the web UI."""
-from db import init_db, create_entry, update_entry, add_tag, create_milestone, get_db
+from db import init_db, bulk_insert_entries, create_milestone
 from datetime import datetime, timedelta
 import random
 
@@ -99,28 +99,21 @@ samples = [
     },
 ]
 
-conn = get_db()
+rows = []
 for s in samples:
     created = datetime.now() - timedelta(days=s["days_ago"], hours=random.randint(0, 12))
-    audio_fn = f"{created.strftime('%Y-%m-%d_%H%M%S')}.wav" if s["source"] == "voice" else None
-    status = "done" if s["transcription"] else "none"
-
-    cursor = conn.execute(
-        """INSERT INTO entries (created_at, updated_at, audio_filename, duration_seconds,
-           transcription, transcription_status, notes, source, is_favorite)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        (created, created, audio_fn, s["duration"], s["transcription"], status,
-         s["notes"], s["source"], 1 if s["favorite"] else 0)
-    )
-    entry_id = cursor.lastrowid
-    for tag in s["tags"]:
-        conn.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
-        tag_row = conn.execute("SELECT id FROM tags WHERE name = ?", (tag,)).fetchone()
-        conn.execute("INSERT OR IGNORE INTO entry_tags (entry_id, tag_id) VALUES (?, ?)",
-                     (entry_id, tag_row["id"]))
-
-conn.commit()
-conn.close()
+    rows.append({
+        "created_at": created,
+        "audio_filename": f"{created.strftime('%Y-%m-%d_%H%M%S')}.wav" if s["source"] == "voice" else None,
+        "duration_seconds": s["duration"],
+        "transcription": s["transcription"],
+        "transcription_status": "done" if s["transcription"] else "none",
+        "notes": s["notes"],
+        "source": s["source"],
+        "is_favorite": s["favorite"],
+        "tags": s["tags"],
+    })
+bulk_insert_entries(rows)
 
 # Add some milestones
 create_milestone("First real grip", (datetime.now() - timedelta(days=45)).strftime("%Y-%m-%d"))
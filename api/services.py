@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Background services for the Murmur API: the transcription queue and
+the retry loop.
+
+In production they run exactly once, in their own process
+(murmur-services.service):
+
+    python3 services.py
+
+while gunicorn serves HTTP (see wsgi.py). The two processes talk through
+events.py: an upload or manual retry in the web process wakes the loop
+here, and status changes made here reach the web process's SSE streams.
+The dev server (python3 app.py) runs the same loop in a thread instead.
+"""
+
+import os
+import time
+
+from config import AUDIO_DIR, TRANSCRIBE_LOCALLY
+from db import init_db, get_untranscribed_entries, get_next_retry_delay
+from events import job_events, listen
+from jobs import transcription_queue, PRIORITY_UPLOAD, PRIORITY_RETRY
+
+# True when the loop runs inside the web process (dev server), so request
+# handlers can hand jobs straight to transcription_queue
+INLINE = False
+
+MAX_SLEEP_SECONDS = 60
+METRICS_LOG_SECONDS = 300  # how often queue metrics go to the log (when they changed)
+
+
+def queue_due_entries():
+    """Queue every pending/failed entry whose backoff is up. Returns how many were due.
+
+    With TRANSCRIBE_LOCALLY off the remote workers claim entries
+    themselves, so nothing is queued here.
+    """
+    if not TRANSCRIBE_LOCALLY:
+        return 0
+    entries = get_untranscribed_entries(due_only=True)
+    for entry in entries:
+        audio_path = os.path.join(AUDIO_DIR, entry["audio_filename"])
+        if not os.path.exists(audio_path):
+            continue
+        # Fresh recordings go ahead of retries
+        priority = PRIORITY_UPLOAD if entry["attempts"] == 0 else PRIORITY_RETRY
+        if transcription_queue.submit(entry["id"], audio_path, priority=priority):
+            print(f"[services] Queued entry {entry['id']}")
+    return len(entries)
+
+
+def retry_loop():
+    """Queue transcriptions as they come in or their backoff runs out.
+
+    Wakes on job_events (new recording, manual retry) and otherwise sleeps
+    until the next retry is due, at most MAX_SLEEP_SECONDS.
+    """
+    version = job_events.version
+    logged_at, logged = time.monotonic(), None
+    while True:
+        delay = MAX_SLEEP_SECONDS
+        try:
+            if queue_due_entries():
+                # Wake long-polling remote workers too; keep our own
+                # version so this doesn't wake us straight back up
+                version = job_events.notify()
+            # Remote workers pick up due retries on their own long-poll cycle
+            next_due = get_next_retry_delay() if TRANSCRIBE_LOCALLY else None
+            if next_due is not None:
+                delay = min(delay, max(next_due, 1))
+        except Exception as e:
+            print(f"[services] Error: {e}")
+        if time.monotonic() - logged_at >= METRICS_LOG_SECONDS:
+            logged_at = time.monotonic()
+            logged = log_queue_metrics(logged)
+        version = job_events.wait(version, delay)
+
+
+def log_queue_metrics(previous=None):
+    """Print transcription_queue.metrics() unless unchanged since `previous`.
+
+    This is what GET /api/transcription/queue shows on the dev server;
+    in production it only lives in this process. Returns the metrics.
+    """
+    metrics = transcription_queue.metrics()
+    if metrics != previous:
+        print("[services] Queue: " + ", ".join(f"{k}={v}" for k, v in metrics.items()))
+    return metrics
+
+
+def start_inline():
+    """Run the background services in a thread of this (dev server) process."""
+    global INLINE
+    import threading
+    INLINE = True
+    threading.Thread(target=retry_loop, daemon=True, name="retry-loop").start()
+
+
+def main():
+    init_db()
+    listen("services")
+    if TRANSCRIBE_LOCALLY:
+        print("[services] Transcription queue and retry loop running")
+    else:
+        print("[services] TRANSCRIBE_LOCALLY is off; leaving transcription to remote workers")
+    retry_loop()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,8 @@ Runs as a background service, syncing every 30 seconds.
 Share structure:
     /home/murmur/share/
     ├── audio/
-    │   ├── 2026-02-15_first-laugh.wav
-    │   └── 2026-02-20_bath-time.wav
+    │   ├── 2026-02-15_first-laugh.flac
+    │   └── 2026-02-20_bath-time.flac
     ├── entries/
     │   ├── 2026-02-15_first-laugh.txt
     │   └── 2026-02-20_bath-time.txt
@@ -121,6 +121,33 @@ def get_entry_filename(entry):
     return f"{date_prefix}_{slug}"
 
 
+def mirror_audio(src, dst):
+    """Put a recording into the share without storing it twice.
+
+    The share and the API's audio directory live on the same SD card, so a
+    hard link costs no space; fall back to copying across filesystems.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def remove_superseded_audio(audio):
+    """Drop share copies of a recording under its old extension.
+
+    After audio_storage.py --migrate turns foo.wav into foo.flac, the share
+    still holds foo.wav from earlier syncs.
+    """
+    stem = os.path.splitext(audio)[0]
+    for f in os.listdir(SHARE_AUDIO):
+        if f != audio and os.path.splitext(f)[0] == stem:
+            try:
+                os.remove(os.path.join(SHARE_AUDIO, f))
+            except OSError:
+                pass
+
+
 def sync():
     """One sync pass — mirror DB entries to share folder."""
     if not os.path.exists(DB_PATH):
@@ -189,7 +216,8 @@ def sync():
             dst = os.path.join(SHARE_AUDIO, audio)
             current_audio_files.add(audio)
             if os.path.exists(src) and not os.path.exists(dst):
-                shutil.copy2(src, dst)
+                mirror_audio(src, dst)
+                remove_superseded_audio(audio)
 
         # Favorites — symlink into favorites folder
         if entry.get("is_favorite"):
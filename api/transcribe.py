@@ -1,18 +1,38 @@
 """Whisper transcription for Murmur voice entries (cloud or local)."""
 
+import hashlib
+import io
 import os
 import subprocess
 import tempfile
 import threading
 import traceback
+import wave
 
 import requests
 
-from config import WHISPER_MODEL, WHISPER_USE_CLOUD, OPENAI_API_KEY, get_persisted_setting
-from db import update_entry
+import audio_storage
+from config import (
+    WHISPER_MODEL, WHISPER_USE_CLOUD, WHISPER_LOCAL_PROCESSES, OPENAI_API_KEY,
+    get_persisted_setting,
+)
+from db import (
+    update_entry, record_transcription_failure,
+    get_cached_transcription, store_cached_transcription,
+)
+
+try:
+    import audio_preprocess
+except ImportError:
+    print("[transcribe] NOTE: numpy not available — preprocessing with sox")
+    audio_preprocess = None
+
+CLOUD_MODEL = "whisper-1"
+NOISE_PROF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "noise.prof")
 
 _model = None
 _model_lock = threading.Lock()
+_chunked = None
 
 
 def _get_model():
@@ -28,15 +48,74 @@ def _get_model():
     return _model
 
 
+def _get_chunked_transcriber():
+    """Lazy-start the chunk-parallel Whisper pool (WHISPER_LOCAL_PROCESSES > 1)."""
+    global _chunked
+    if _chunked is None:
+        with _model_lock:
+            if _chunked is None:
+                from chunked_transcribe import ChunkedTranscriber
+                _chunked = ChunkedTranscriber(WHISPER_MODEL, WHISPER_LOCAL_PROCESSES)
+    return _chunked
+
+
+def _decode(entry_id, filepath):
+    """Decode a FLAC/Opus recording to WAV bytes, once per transcription.
+
+    The bytes are shared by audio_hash and _preprocess_audio. Returns None
+    for WAVs (read straight from disk) and when decoding fails.
+    """
+    if not filepath.lower().endswith(audio_storage.COMPRESSED):
+        return None
+    try:
+        return audio_storage.decode_wav_bytes(filepath)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[transcribe] Entry {entry_id} could not decode {filepath}: {e}")
+        return None
+
+
+def _preprocess_audio(filepath, decoded=None):
+    """Downsample + noise reduction + notch filtering in memory.
+
+    `decoded` is the recording already decoded to WAV bytes (see _decode).
+    Returns 16 kHz mono float32 samples, or None when the file can't be
+    handled in-process (numpy missing, or not a WAV) so sox should be used.
+    """
+    if audio_preprocess is None:
+        return None
+    try:
+        noise_prof = NOISE_PROF if os.path.exists(NOISE_PROF) else None
+        source = decoded if decoded is not None else filepath
+        return audio_preprocess.preprocess(source, noise_profile=noise_prof)
+    except ValueError:
+        return None
+    except Exception as e:
+        print(f"[transcribe] In-memory preprocessing failed, trying sox: {e}")
+        return None
+
+
+def _trim_silence(entry_id, samples):
+    """Cut silence out of preprocessed samples before they reach Whisper.
+
+    Logs and stores how many seconds of speech were kept, so the saving
+    shows up per entry.
+    """
+    rate = audio_preprocess.TARGET_RATE
+    trimmed = audio_preprocess.trim_silence(samples, rate)
+    before, after = len(samples) / rate, len(trimmed) / rate
+    print(f"[transcribe] Entry {entry_id}: trimmed {before:.1f}s -> {after:.1f}s of speech")
+    update_entry(entry_id, speech_seconds=round(after, 2))
+    return trimmed
+
+
 def _downsample_audio(filepath):
     """Downsample to 16kHz mono WAV with noise reduction and notch filtering. Returns temp path or None."""
     tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
     tmp.close()
-    noise_prof = os.path.join(os.path.dirname(os.path.abspath(__file__)), "noise.prof")
     try:
         cmd = ["sox", filepath, tmp.name, "rate", "16000", "channels", "1"]
-        if os.path.exists(noise_prof):
-            cmd += ["noisered", noise_prof, "0.05"]
+        if os.path.exists(NOISE_PROF):
+            cmd += ["noisered", NOISE_PROF, "0.05"]
         cmd += ["bandreject", "550", "20q", "bandreject", "450", "20q",
                 "bandreject", "750", "20q", "bandreject", "7000", "50q"]
         subprocess.run(cmd, check=True, capture_output=True, timeout=60)
@@ -50,40 +129,130 @@ def _downsample_audio(filepath):
         return None
 
 
+def _hash_pcm(wav_file):
+    """Hash a WAV's sample format and frames (not its header)."""
+    h = hashlib.blake2b(digest_size=20)
+    with wave.open(wav_file, "rb") as w:
+        h.update(f"{w.getframerate()}:{w.getnchannels()}:{w.getsampwidth()}".encode())
+        while True:
+            frames = w.readframes(65536)
+            if not frames:
+                break
+            h.update(frames)
+    return "pcm:" + h.hexdigest()
+
+
+def audio_hash(filepath, decoded=None):
+    """BLAKE2b digest of a recording's audio content.
+
+    For WAV files only the sample format and PCM frames are hashed, so the
+    same audio with a rewritten header still matches. FLAC/Opus recordings
+    are decoded first (or hashed from `decoded`, if the caller already
+    has the WAV bytes); FLAC is lossless, so a migrated recording keeps the
+    hash (and cached transcript) it had as WAV. Anything else is hashed
+    byte for byte.
+    """
+    try:
+        if decoded is not None:
+            return _hash_pcm(io.BytesIO(decoded))
+        if filepath.lower().endswith(audio_storage.COMPRESSED):
+            return _hash_pcm(io.BytesIO(audio_storage.decode_wav_bytes(filepath)))
+        return _hash_pcm(filepath)
+    except (wave.Error, EOFError, OSError, subprocess.SubprocessError):
+        pass
+    h = hashlib.blake2b(digest_size=20)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return "file:" + h.hexdigest()
+
+
+def _from_cache(entry_id, filepath, backend, model, decoded=None):
+    """Look the audio up in the transcription cache.
+
+    Returns (digest, hit). On a hit the entry is already marked done.
+    """
+    try:
+        digest = audio_hash(filepath, decoded)
+    except OSError as e:
+        print(f"[transcribe] Entry {entry_id} could not hash audio: {e}")
+        return None, False
+    text = get_cached_transcription(digest, backend, model)
+    if text is None:
+        return digest, False
+    update_entry(entry_id, transcription=text, transcription_status="done")
+    print(f"[transcribe] Entry {entry_id} done from cache ({len(text)} chars)")
+    return digest, True
+
+
 def transcribe_entry_cloud(entry_id, filepath, client_key=None):
     """Send audio to OpenAI Whisper API and write the result back to the database."""
+    decoded = _decode(entry_id, filepath)
+    digest, hit = _from_cache(entry_id, filepath, "openai", CLOUD_MODEL, decoded)
+    if hit:
+        return
+
     api_key = client_key or get_persisted_setting("openai_api_key") or OPENAI_API_KEY
     if not api_key:
-        print(f"[transcribe] Entry {entry_id} — no OpenAI API key available, skipping cloud transcription")
-        update_entry(entry_id, transcription_status="failed")
+        # A setup problem, not the entry's: back off without using up an
+        # attempt, so it's picked up once a key is saved
+        record_transcription_failure(entry_id, "no OpenAI API key", count_attempt=False)
+        print(f"[transcribe] Entry {entry_id} — no OpenAI API key available, "
+              f"skipping cloud transcription (will retry)")
         return
 
-    downsampled = _downsample_audio(filepath)
-    upload_path = downsampled or filepath
+    def post(audio_file):
+        return requests.post(
+            "https://api.openai.com/v1/audio/transcriptions",
+            headers={"Authorization": f"Bearer {api_key}"},
+            files={"file": audio_file},
+            data={"model": CLOUD_MODEL},
+            timeout=300,
+        )
 
+    downsampled = None
     try:
-        print(f"[transcribe] Starting cloud transcription for entry {entry_id}: {upload_path}")
-        with open(upload_path, "rb") as audio_file:
-            resp = requests.post(
-                "https://api.openai.com/v1/audio/transcriptions",
-                headers={"Authorization": f"Bearer {api_key}"},
-                files={"file": audio_file},
-                data={"model": "whisper-1"},
-                timeout=300,
-            )
+        samples = _preprocess_audio(filepath, decoded)
+        decoded = None  # not needed past preprocessing; free it before the upload
+        if samples is not None:
+            samples = _trim_silence(entry_id, samples)
+        downsampled = _downsample_audio(filepath) if samples is None else None
+        upload_path = downsampled or filepath
+
+        if samples is not None:
+            wav = audio_preprocess.to_wav_bytes(samples)
+            print(f"[transcribe] Preprocessed {os.path.getsize(filepath) // 1024}KB -> "
+                  f"{len(wav) // 1024}KB in memory")
+            print(f"[transcribe] Starting cloud transcription for entry {entry_id}: {filepath}")
+            resp = post(("audio.wav", wav, "audio/wav"))
+        else:
+            print(f"[transcribe] Starting cloud transcription for entry {entry_id}: {upload_path}")
+            with open(upload_path, "rb") as audio_file:
+                resp = post(audio_file)
         if not resp.ok:
             print(f"[transcribe] Entry {entry_id} OpenAI error {resp.status_code}: {resp.text}")
         resp.raise_for_status()
         text = resp.json().get("text", "").strip()
         update_entry(entry_id, transcription=text, transcription_status="done")
+        if digest:
+            store_cached_transcription(digest, "openai", CLOUD_MODEL, text)
         print(f"[transcribe] Entry {entry_id} done via cloud ({len(text)} chars)")
-    except (requests.ConnectionError, requests.Timeout, OSError) as e:
-        # Network unavailable — leave as 'pending' so it gets retried
+    except (requests.ConnectionError, requests.Timeout) as e:
+        # Network unavailable — stays 'pending' and retries later without
+        # using up an attempt
+        record_transcription_failure(entry_id, str(e), count_attempt=False)
         print(f"[transcribe] Entry {entry_id} network error (will retry): {e}")
-    except Exception:
+    except requests.HTTPError as e:
+        # OpenAI answered: a 4xx (bad file, bad key) won't fix itself, and
+        # a 429/5xx should back off, so both use up an attempt. Caught
+        # before the generic handler only to skip the traceback.
+        status = record_transcription_failure(entry_id, str(e))
+        print(f"[transcribe] Entry {entry_id} cloud transcription FAILED "
+              f"(HTTP {e.response.status_code}, {status})")
+    except Exception as e:
         traceback.print_exc()
-        update_entry(entry_id, transcription_status="failed")
-        print(f"[transcribe] Entry {entry_id} cloud transcription FAILED")
+        status = record_transcription_failure(entry_id, str(e))
+        print(f"[transcribe] Entry {entry_id} cloud transcription FAILED ({status})")
     finally:
         if downsampled:
             os.unlink(downsampled)
@@ -93,19 +262,37 @@ def transcribe_entry(entry_id, filepath, client_key=None):
     """Transcribe an audio entry (cloud or local depending on config).
 
     Intended to be called in a background thread.  Sets
-    transcription_status to "done" on success, "failed" on error.
+    transcription_status to "done" on success, "failed" on error ("dead"
+    once TRANSCRIBE_MAX_ATTEMPTS is reached).
     """
     if WHISPER_USE_CLOUD:
         return transcribe_entry_cloud(entry_id, filepath, client_key=client_key)
 
+    decoded = _decode(entry_id, filepath)
+    digest, hit = _from_cache(entry_id, filepath, "local", WHISPER_MODEL, decoded)
+    if hit:
+        return
+
     try:
         print(f"[transcribe] Starting local transcription for entry {entry_id}: {filepath}")
-        model = _get_model()
-        result = model.transcribe(filepath)
-        text = result.get("text", "").strip()
+        # Whisper takes a 16 kHz float32 array directly; fall back to letting
+        # it decode the file itself (via ffmpeg) for formats we can't read
+        samples = _preprocess_audio(filepath, decoded)
+        decoded = None
+        if samples is not None:
+            samples = _trim_silence(entry_id, samples)
+        if samples is not None and WHISPER_LOCAL_PROCESSES > 1:
+            text, chunks = _get_chunked_transcriber().transcribe(samples)
+            print(f"[transcribe] Entry {entry_id} transcribed in {chunks} chunks")
+        else:
+            model = _get_model()
+            result = model.transcribe(samples if samples is not None else filepath)
+            text = result.get("text", "").strip()
         update_entry(entry_id, transcription=text, transcription_status="done")
+        if digest:
+            store_cached_transcription(digest, "local", WHISPER_MODEL, text)
         print(f"[transcribe] Entry {entry_id} done ({len(text)} chars)")
-    except Exception:
+    except Exception as e:
         traceback.print_exc()
-        update_entry(entry_id, transcription_status="failed")
-        print(f"[transcribe] Entry {entry_id} FAILED")
+        status = record_transcription_failure(entry_id, str(e))
+        print(f"[transcribe] Entry {entry_id} FAILED ({status})")
@@ -0,0 +1,14 @@
+"""Production WSGI entry point for the Murmur API.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Serves HTTP only. The transcription queue and retry loop run once, in
+services.py (murmur-services.service), never in the web process.
+"""
+
+from app import app
+from db import init_db
+from events import listen
+
+init_db()
+listen("web")
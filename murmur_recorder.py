@@ -10,7 +10,9 @@ Interaction flow:
   Idle        → LED off, waiting for button press
   Press       → Start recording, LED on solid
   Press again → Stop recording, LED blink while uploading
-  Upload      → POST audio to API
+  Upload      → POST audio to API (or, with --stream, audio is sent to
+                /api/entries/stream while recording and the entry is
+                created as soon as the stream ends)
   Success     → LED off, return to idle
   Error       → LED rapid blink, return to idle
 
@@ -26,6 +28,8 @@ Usage:
   python3 murmur_recorder.py
   # Or specify sound card:
   python3 murmur_recorder.py --card 1
+  # Stream audio to the API while recording:
+  python3 murmur_recorder.py --stream
 """
 
 import argparse
@@ -49,6 +53,15 @@ except ImportError:
     GPIOLED = None
     _pin_factory = None
 
+# Shared in-process audio conversion (api/audio_preprocess.py, needs numpy)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+try:
+    import numpy as np
+    import audio_preprocess
+except ImportError:
+    print("[recorder] NOTE: numpy not available — converting audio with sox")
+    audio_preprocess = None
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -65,6 +78,10 @@ LED_GPIO = 13         # GPIO13 (Pin 33)
 # Software gain boost (dB) — set to 0 for no boost, increase if too quiet
 GAIN_DB = 0
 
+# Streaming mode: convert and send audio while recording (needs numpy)
+STREAM_UPLOAD = os.environ.get("MURMUR_STREAM_UPLOAD", "") == "1"
+STREAM_BLOCK_SEC = 0.25  # audio per chunk sent to the API
+
 
 # ---------------------------------------------------------------------------
 # State
@@ -81,11 +98,16 @@ class State:
 # ---------------------------------------------------------------------------
 
 class MurmurRecorder:
-    def __init__(self, card_index=None):
+    def __init__(self, card_index=None, stream=False):
         self.card_index = card_index if card_index is not None else 1
+        self.stream = stream and audio_preprocess is not None
+        if stream and not self.stream:
+            print("[recorder] NOTE: streaming needs numpy — recording to a file instead")
         self._record_proc = None
         self._rec_file = None
         self._rec_start_time = None
+        self._stream_thread = None
+        self._stream_result = None
 
         self.state = State.IDLE
         self._lock = threading.Lock()
@@ -169,12 +191,13 @@ class MurmurRecorder:
         self._rec_start_time = time.time()
 
         hw_device = f"plughw:{self.card_index},0"
+        cmd = ["arecord", "-D", hw_device, "-f", FORMAT, "-r", str(SAMPLE_RATE),
+               "-c", str(CHANNELS), "-d", str(MAX_RECORD_SEC)]
+        # Streaming: raw samples on stdout, read as they are captured
+        cmd += ["-t", "raw"] if self.stream else ["-t", "wav", self._rec_file]
         try:
             self._record_proc = subprocess.Popen(
-                ["arecord", "-D", hw_device, "-f", FORMAT, "-r", str(SAMPLE_RATE),
-                 "-c", str(CHANNELS), "-t", "wav", "-d", str(MAX_RECORD_SEC),
-                 self._rec_file],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
             )
         except Exception as e:
             print(f"[recorder] ERROR starting arecord: {e}")
@@ -182,6 +205,12 @@ class MurmurRecorder:
             self._led_off()
             return
 
+        if self.stream:
+            self._stream_result = None
+            self._stream_thread = threading.Thread(
+                target=self._stream_upload, args=(self._record_proc.stdout,), daemon=True)
+            self._stream_thread.start()
+
     def _stop_recording(self):
         """Stop recording and kick off upload in background thread."""
         print("[recorder] stopping recording...")
@@ -206,6 +235,9 @@ class MurmurRecorder:
         print(f"[recorder] recorded {duration:.1f}s")
 
         # Upload in background so button callback returns quickly
+        if self.stream:
+            threading.Thread(target=self._finish_stream_and_idle, daemon=True).start()
+            return
         threading.Thread(
             target=self._upload_and_idle,
             args=(filepath, round(duration, 1)),
@@ -215,7 +247,20 @@ class MurmurRecorder:
     # ==================== Upload ====================
 
     def _filter_audio(self, filepath):
-        """Convert to 16kHz mono 16-bit WAV for Whisper, with optional gain."""
+        """Convert to 16kHz mono 16-bit WAV for Whisper, with optional gain.
+
+        Returns the converted WAV as bytes when done in memory; otherwise
+        converts the file in place with sox and returns None.
+        """
+        gain_str = f", gain +{GAIN_DB}dB" if GAIN_DB else ""
+        if audio_preprocess is not None:
+            try:
+                samples = audio_preprocess.preprocess(filepath, notches=(), gain_db=GAIN_DB)
+                print(f"[recorder] audio converted in memory (16kHz mono{gain_str})")
+                return audio_preprocess.to_wav_bytes(samples)
+            except Exception as e:
+                print(f"[recorder] in-memory convert failed, trying sox: {e}")
+
         filtered = filepath + ".filtered.wav"
         try:
             cmd = ["sox", filepath, filtered, "rate", "16000", "channels", "1"]
@@ -223,7 +268,6 @@ class MurmurRecorder:
                 cmd += ["gain", str(GAIN_DB)]
             subprocess.run(cmd, check=True, capture_output=True, timeout=60)
             os.replace(filtered, filepath)
-            gain_str = f", gain +{GAIN_DB}dB" if GAIN_DB else ""
             print(f"[recorder] audio converted (16kHz mono{gain_str})")
         except Exception as e:
             print(f"[recorder] audio convert failed, using original: {e}")
@@ -244,16 +288,14 @@ class MurmurRecorder:
             return
 
         # Filter/boost audio
-        self._filter_audio(filepath)
+        converted = self._filter_audio(filepath)
 
         try:
-            with open(filepath, "rb") as f:
-                resp = requests.post(
-                    f"{API_URL}/api/entries",
-                    files={"audio": ("recording.wav", f, "audio/wav")},
-                    data={"source": "recorder", "duration": str(duration)},
-                    timeout=30,
-                )
+            if converted is not None:
+                resp = self._post_audio(converted, duration)
+            else:
+                with open(filepath, "rb") as f:
+                    resp = self._post_audio(f, duration)
             resp.raise_for_status()
 
             entry = resp.json()
@@ -274,6 +316,73 @@ class MurmurRecorder:
 
         self._go_idle()
 
+    def _stream_chunks(self, pipe):
+        """Yield 16 kHz 16-bit PCM converted from arecord's raw output as it arrives."""
+        frame_bytes = 4 * CHANNELS  # S32_LE
+        block = int(SAMPLE_RATE * STREAM_BLOCK_SEC) * frame_bytes
+        resampler = audio_preprocess.StreamResampler(SAMPLE_RATE)
+        leftover = b""
+        while True:
+            raw = pipe.read(block)
+            if raw:
+                raw = leftover + raw
+                usable = len(raw) - len(raw) % frame_bytes
+                leftover = raw[usable:]
+                samples = np.frombuffer(raw[:usable], "<i4").astype(np.float32) / 2 ** 31
+                if CHANNELS > 1:
+                    samples = samples.reshape(-1, CHANNELS).mean(axis=1, dtype=np.float32)
+                out = resampler.feed(samples)
+            else:
+                out = resampler.flush()
+            out = audio_preprocess.apply_gain(out, GAIN_DB)
+            yield (np.clip(out, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+            if not raw:
+                return
+
+    def _stream_upload(self, pipe):
+        """POST the recording to /api/entries/stream while it is being made."""
+        try:
+            self._stream_result = requests.post(
+                f"{API_URL}/api/entries/stream",
+                params={"rate": audio_preprocess.TARGET_RATE, "source": "recorder"},
+                data=self._stream_chunks(pipe),
+                headers={"Content-Type": f"audio/L16; rate={audio_preprocess.TARGET_RATE}"},
+                timeout=30,
+            )
+        except Exception as e:
+            self._stream_result = e
+
+    def _finish_stream_and_idle(self):
+        """Wait for the streamed upload to finish, then return to idle."""
+        self._stop_led_blink()
+        self._start_led_blink(0.15, 0.15)
+
+        self._stream_thread.join(timeout=60)
+        result = self._stream_result
+        if isinstance(result, requests.ConnectionError):
+            print("[recorder] ERROR: cannot connect to API")
+        elif isinstance(result, Exception):
+            print(f"[recorder] ERROR: {result}")
+        elif result is None:
+            print("[recorder] ERROR: upload did not finish")
+        elif result.status_code == 400:
+            print(f"[recorder] {result.json().get('error', 'rejected')}, discarded")
+        elif not result.ok:
+            print(f"[recorder] ERROR: HTTP {result.status_code}")
+        else:
+            print(f"[recorder] uploaded entry #{result.json().get('id', '?')}")
+
+        self._stream_thread = None
+        self._go_idle()
+
+    def _post_audio(self, audio, duration):
+        return requests.post(
+            f"{API_URL}/api/entries",
+            files={"audio": ("recording.wav", audio, "audio/wav")},
+            data={"source": "recorder", "duration": str(duration)},
+            timeout=30,
+        )
+
     def _cleanup_file(self, filepath):
         try:
             if filepath and os.path.exists(filepath):
@@ -300,7 +409,7 @@ class MurmurRecorder:
         print(f"  Gain:       +{GAIN_DB}dB")
         print(f"  Button:     GPIO{BUTTON_GPIO}")
         print(f"  LED:        GPIO{LED_GPIO}" + (" (not wired)" if not self._led else ""))
-        print(f"  API:        {API_URL}")
+        print(f"  API:        {API_URL}" + (" (streaming)" if self.stream else ""))
         print(f"  Max rec:    {MAX_RECORD_SEC}s")
         print()
         print("  Press button → record")
@@ -336,10 +445,13 @@ if __name__ == "__main__":
                         help="ALSA sound card number (default: 1)")
     parser.add_argument("--gain", type=int, default=None,
                         help=f"Software gain in dB (default: {GAIN_DB})")
+    parser.add_argument("--stream", action="store_true", default=STREAM_UPLOAD,
+                        help="Send audio to the API while recording "
+                             "(default: MURMUR_STREAM_UPLOAD=1)")
     args = parser.parse_args()
 
     if args.gain is not None:
         GAIN_DB = args.gain
 
-    recorder = MurmurRecorder(card_index=args.card)
+    recorder = MurmurRecorder(card_index=args.card, stream=args.stream)
     recorder.run()
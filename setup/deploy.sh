@@ -17,7 +17,7 @@ echo "=============================="
 
 # --- 1. Build frontend ---
 echo ""
-echo "[1/4] Building frontend..."
+echo "[1/5] Building frontend..."
 cd "$PROJECT_DIR"
 npm install
 npm run build
@@ -30,23 +30,32 @@ echo "  Build complete."
 
 # --- 2. Upload built files ---
 echo ""
-echo "[2/4] Uploading to Pi ($PI_HOST)..."
+echo "[2/5] Uploading to Pi ($PI_HOST)..."
 scp -r public/ "$PI_HOST:$PI_DIR/"
 echo "  Frontend uploaded."
 
 # --- 3. Upload API, setup, and recorder ---
 # Use rsync for api/ to exclude data files that live only on the Pi
 echo ""
-echo "[3/4] Uploading API, setup, and recorder..."
+echo "[3/5] Uploading API, setup, and recorder..."
 rsync -av --exclude 'journal.db*' --exclude 'audio/' --exclude 'settings.json' --exclude '__pycache__/' api/ "$PI_HOST:$PI_DIR/api/"
 scp -r setup/ "$PI_HOST:$PI_DIR/"
 scp murmur_recorder.py noise.prof "$PI_HOST:$PI_DIR/"
 echo "  Files uploaded."
 
-# --- 4. Restart services ---
+# --- 4. Install packages added since setup.sh ran ---
+# murmur-api.service runs gunicorn; without it the API won't start
 echo ""
-echo "[4/4] Restarting services on Pi..."
-ssh "$PI_HOST" "sudo systemctl restart murmur-api murmur-recorder 2>/dev/null || true"
+echo "[4/5] Installing system packages on Pi..."
+ssh "$PI_HOST" "sudo apt-get install -y gunicorn python3-numpy opus-tools || (sudo apt-get update -y && sudo apt-get install -y gunicorn python3-numpy opus-tools)"
+ssh "$PI_HOST" "test -x /usr/bin/gunicorn" || { echo "ERROR: gunicorn missing on the Pi — not replacing the service files"; exit 1; }
+echo "  Packages installed."
+
+# --- 5. Restart services ---
+echo ""
+echo "[5/5] Restarting services on Pi..."
+ssh "$PI_HOST" "sudo cp $PI_DIR/setup/murmur-api.service $PI_DIR/setup/murmur-services.service /etc/systemd/system/ && sudo systemctl daemon-reload && sudo systemctl enable murmur-services 2>/dev/null || true"
+ssh "$PI_HOST" "sudo systemctl restart murmur-api murmur-services murmur-recorder 2>/dev/null || true"
 echo "  Services restarted."
 
 echo ""
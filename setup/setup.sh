@@ -23,11 +23,11 @@ echo ""
 echo "[1/7] Installing system packages..."
 apt-get update -y
 apt-get install -y \
-    python3 python3-flask python3-flask-cors python3-requests \
+    python3 python3-flask python3-flask-cors python3-requests python3-numpy gunicorn \
     python3-gpiozero python3-lgpio \
     nginx samba avahi-daemon \
     alsa-utils \
-    sox
+    sox opus-tools
 
 echo ""
 echo "[2/7] Skipping local whisper — cloud transcription is used"
@@ -71,6 +71,10 @@ chown -R murmur:murmur "$SHARE_DIR"
 chown -R murmur:murmur "$MURMUR_HOME"
 # Allow nginx (www-data) to traverse into public/
 chmod o+x /home/murmur /home/murmur/murmur /home/murmur/murmur/public
+# Let nginx read recordings for /api/audio (X-Accel-Redirect) via the
+# murmur group, without making them world-readable
+usermod -aG murmur www-data
+chmod 750 "$MURMUR_HOME/api/audio"
 
 # --- 4. nginx + HTTPS ---
 echo ""
@@ -110,13 +114,15 @@ systemctl restart smbd
 echo ""
 echo "[6/7] Installing systemd services..."
 cp "$MURMUR_HOME/setup/murmur-api.service" /etc/systemd/system/
+cp "$MURMUR_HOME/setup/murmur-services.service" /etc/systemd/system/
 cp "$MURMUR_HOME/setup/murmur-sync.service" /etc/systemd/system/
 cp "$MURMUR_HOME/setup/murmur-recorder.service" /etc/systemd/system/
 cp "$MURMUR_HOME/setup/murmur-hotspot.service" /etc/systemd/system/
 chmod +x "$MURMUR_HOME/setup/murmur-hotspot.sh"
 systemctl daemon-reload
-systemctl enable murmur-api murmur-sync murmur-recorder murmur-hotspot
+systemctl enable murmur-api murmur-services murmur-sync murmur-recorder murmur-hotspot
 systemctl start murmur-api
+systemctl start murmur-services
 systemctl start murmur-sync
 # Recorder uses INMP441 I2S mic via googlevoicehat-soundcard overlay
 systemctl start murmur-recorder || echo "  Note: recorder may need reboot for I2S overlay"
@@ -132,6 +138,12 @@ else
     echo "  murmur-api:      FAILED (check: sudo journalctl -u murmur-api)"
 fi
 
+if systemctl is-active --quiet murmur-services; then
+    echo "  murmur-services: RUNNING"
+else
+    echo "  murmur-services: FAILED (check: sudo journalctl -u murmur-services)"
+fi
+
 if systemctl is-active --quiet murmur-sync; then
     echo "  murmur-sync:     RUNNING"
 else
@@ -80,8 +80,17 @@ function renderTimelineCard(entry) {
     return li;
 }
 
+// Search snippets come back with matches wrapped in <mark>; escape everything
+// else and let only those tags through.
+function highlightSnippet(snippet) {
+    return escapeHtml(snippet)
+        .replace(/&lt;mark&gt;/g, "<mark>")
+        .replace(/&lt;\/mark&gt;/g, "</mark>");
+}
+
 function renderSearchCard(entry) {
     const { day, month, time } = formatDate(entry.created_at);
+    const preview = entry.snippet ? highlightSnippet(entry.snippet) : escapeHtml(getPreviewText(entry));
     const li = document.createElement("li");
     li.className = "cs-result-item";
     li.innerHTML = `
@@ -96,7 +105,7 @@ function renderSearchCard(entry) {
                     <span class="cs-date">${time}</span>
                     <span class="cs-source">${sourceLabel(entry)}</span>
                 </div>
-                <p class="cs-item-text">${escapeHtml(getPreviewText(entry))}</p>
+                <p class="cs-item-text">${preview}</p>
             </div>
         </a>
     `;
@@ -137,6 +146,7 @@ async function initTimeline() {
         for (const entry of entriesData.entries) {
             container.appendChild(renderTimelineCard(entry));
         }
+        initInfiniteScroll(container, entriesData.next_cursor);
     } catch (err) {
         if (statsEl) {
             statsEl.textContent = `API: ${API || "(empty)"} — Error: ${err.message}`;
@@ -145,16 +155,58 @@ async function initTimeline() {
     }
 }
 
+// Load older entries as the bottom of the timeline scrolls into view. Uses the
+// API's keyset cursor so each page costs the same no matter how deep it is.
+function initInfiniteScroll(container, cursor) {
+    if (!cursor || !("IntersectionObserver" in window)) return;
+
+    const sentinel = document.createElement("div");
+    container.after(sentinel);
+    let loading = false;
+
+    const observer = new IntersectionObserver(async (items) => {
+        if (!items[0].isIntersecting || loading || !cursor) return;
+        loading = true;
+        try {
+            const res = await fetch(`${API}/api/entries?before=${encodeURIComponent(cursor)}`);
+            const data = await res.json();
+            for (const entry of data.entries) {
+                container.appendChild(renderTimelineCard(entry));
+            }
+            cursor = data.next_cursor;
+        } catch (err) {
+            // Leave the cursor alone so the next scroll retries
+        }
+        loading = false;
+        if (!cursor) {
+            observer.disconnect();
+            sentinel.remove();
+        }
+    }, { rootMargin: "400px" });
+    observer.observe(sentinel);
+}
+
 // ─────────────────────────────────────────────────────────────────────────────
 // Search page
 // ─────────────────────────────────────────────────────────────────────────────
 
 let searchTimeout = null;
+let searchScroll = null; // { observer, sentinel } for the current results
+let searchGeneration = 0; // drops responses for queries the user has moved past
+
+function stopSearchScroll() {
+    if (!searchScroll) return;
+    searchScroll.observer.disconnect();
+    searchScroll.sentinel.remove();
+    searchScroll = null;
+}
 
 async function doSearch(query) {
     const container = document.getElementById("search-results");
     if (!container) return;
 
+    const generation = ++searchGeneration;
+    stopSearchScroll();
     if (!query) {
         container.innerHTML = "";
         return;
@@ -162,6 +214,7 @@ async function doSearch(query) {
 
     const res = await fetch(`${API}/api/search?q=${encodeURIComponent(query)}`);
     const data = await res.json();
+    if (generation !== searchGeneration) return;
 
     container.innerHTML = "";
     if (data.entries.length === 0) {
@@ -171,6 +224,43 @@ async function doSearch(query) {
     for (const entry of data.entries) {
         container.appendChild(renderSearchCard(entry));
     }
+    initSearchScroll(container, query, data, generation);
+}
+
+// Load further result pages as the bottom of the list scrolls into view,
+// the same way the timeline does (search pages by number, not cursor)
+function initSearchScroll(container, query, data, generation) {
+    let page = data.page;
+    const perPage = data.per_page;
+    const total = data.total;
+    if (page * perPage >= total || !("IntersectionObserver" in window)) return;
+
+    const sentinel = document.createElement("div");
+    container.after(sentinel);
+    let loading = false;
+
+    const observer = new IntersectionObserver(async (items) => {
+        if (!items[0].isIntersecting || loading) return;
+        loading = true;
+        try {
+            const res = await fetch(`${API}/api/search?q=${encodeURIComponent(query)}&page=${page + 1}&per_page=${perPage}`);
+            const next = await res.json();
+            if (generation !== searchGeneration) return;
+            for (const entry of next.entries) {
+                container.appendChild(renderSearchCard(entry));
+            }
+            page = next.page;
+            if (next.entries.length === 0 || page * perPage >= next.total) {
+                stopSearchScroll();
+            }
+        } catch (err) {
+            // Keep the page number so the next scroll retries
+        } finally {
+            loading = false;
+        }
+    }, { rootMargin: "400px" });
+    observer.observe(sentinel);
+    searchScroll = { observer, sentinel };
 }
 
 async function initSearch() {
@@ -543,10 +633,14 @@ async function initEntryDetail() {
             const audioSection = document.getElementById("entry-audio");
             const player = document.getElementById("entry-player");
             player.src = `${API}/api/audio/${entry.audio_filename}`;
+            // Older Safari can't play Opus — have the Pi decode it to WAV
+            if (entry.audio_codec === "opus" && !player.canPlayType('audio/ogg; codecs="opus"')) {
+                player.src += "?format=wav";
+            }
             audioSection.style.display = "";
         }
 
-        // Transcription (with polling for pending status)
+        // Transcription (live while pending)
         const transcriptionSection = document.getElementById("entry-transcription-section");
         const transcriptionEl = document.getElementById("entry-transcription");
         const retryBtn = document.getElementById("entry-retry-btn");
@@ -561,28 +655,57 @@ async function initEntryDetail() {
             } else if (e.transcription_status === "failed") {
                 transcriptionEl.textContent = "Transcription failed.";
                 transcriptionSection.style.display = "";
+            } else if (e.transcription_status === "dead") {
+                transcriptionEl.textContent = `Transcription failed after ${e.attempts} attempts.`;
+                transcriptionSection.style.display = "";
             }
             // Show retry button on any entry that has audio
             retryBtn.style.display = e.audio_filename ? "" : "none";
         }
         showTranscription(entry);
 
-        function startTranscriptionPolling() {
-            const pollInterval = setInterval(async () => {
+        // Live status: the Pi pushes status changes over SSE, and the entry
+        // is fetched again only once its transcription has settled
+        let statusStream = null;
+        function watchTranscription() {
+            if (statusStream) return;
+            const stream = new EventSource(`${API}/api/events?entry=${id}`);
+            statusStream = stream;
+            const stop = () => {
+                stream.close();
+                if (statusStream === stream) statusStream = null;
+            };
+            // Resolves to whether the entry is still pending
+            const refresh = async () => {
                 try {
-                    const pollRes = await fetch(`${API}/api/entries/${id}`);
-                    if (!pollRes.ok) return;
-                    const updated = await pollRes.json();
+                    const r = await fetch(`${API}/api/entries/${id}`);
+                    if (!r.ok) return true;
+                    const updated = await r.json();
                     showTranscription(updated);
                     if (updated.transcription_status !== "pending") {
-                        clearInterval(pollInterval);
+                        stop();
+                        return false;
                     }
                 } catch (_) {}
-            }, 3000);
+                return true;
+            };
+            stream.addEventListener("status", (ev) => {
+                if (JSON.parse(ev.data).transcription_status !== "pending") refresh();
+            });
+            stream.addEventListener("resync", refresh);
+            // EventSource gives up for good on a non-200, e.g. the 503 when
+            // the Pi has too many streams open: check back in a while
+            stream.addEventListener("error", () => {
+                if (stream.readyState !== EventSource.CLOSED) return;
+                stop();
+                setTimeout(async () => {
+                    if (await refresh()) watchTranscription();
+                }, 30000);
+            });
         }
 
         if (entry.transcription_status === "pending") {
-            startTranscriptionPolling();
+            watchTranscription();
         }
 
         // Retry transcription button
@@ -600,7 +723,7 @@ async function initEntryDetail() {
                 if (r.ok) {
                     const updated = await r.json();
                     showTranscription(updated);
-                    startTranscriptionPolling();
+                    watchTranscription();
                 } else {
                     retryBtn.innerHTML = "Retry failed — tap to try again";
                 }
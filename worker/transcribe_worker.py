@@ -1,31 +1,95 @@
 """Remote Whisper transcription worker for Murmur.
 
-Runs on a capable machine (e.g. Mac Mini) and polls the Pi's API
-for untranscribed voice entries, transcribes them locally with Whisper,
-and pushes the results back.
+Runs on a capable machine (e.g. Mac Mini) and polls one or more Pis'
+APIs for untranscribed voice entries, transcribes them locally with
+Whisper, and pushes the results back.
+
+Each entry is leased from its Pi before work starts and the lease is kept
+alive with heartbeats, so several workers (and the Pi itself) can run
+against one Pi without transcribing the same file twice.
+
+Long recordings are split at pauses and transcribed chunk-parallel across
+MURMUR_TRANSCRIBE_PROCESSES Whisper processes (set it to 1 to transcribe
+each file in one call in a worker thread). Silence is trimmed out with
+an energy VAD first, so Whisper only sees the speech.
+
+All network I/O runs on one asyncio event loop. Each Pi listed in
+MURMUR_API_URL (comma-separated) gets its own three-stage pipeline: claim
+and download up to MURMUR_PREFETCH entries ahead, transcribe, push the
+result back. Whisper itself runs off the loop on a single thread shared by
+every Pi, so entries from different households are transcribed in the
+order they were downloaded while the other Pis' downloads, pushes and
+heartbeats carry on. Per-stage timings are printed after each batch.
+
+With MURMUR_PUSH_BATCH above 1, finished results are held for up to
+MURMUR_PUSH_LINGER seconds and sent together through
+/api/entries/batch-update, one transaction on the Pi instead of one per
+entry. Worth it when draining a large backlog (e.g. after recover_audio.py).
+
+Between batches each pipeline long-polls its Pi's /api/jobs/wait, so it
+wakes as soon as a recording is uploaded instead of on the next poll.
+Against a Pi without that endpoint it falls back to polling every
+MURMUR_POLL_INTERVAL.
+
+On SIGINT/SIGTERM the worker stops claiming, pushes results that are
+already transcribed, and releases every other lease it holds so the
+entries can be picked up again straight away.
 
 Usage:
-    pip3 install openai-whisper requests
-    python3 transcribe_worker.py
+    pip3 install openai-whisper httpx
+    MURMUR_API_URL=https://pi-one.local,https://pi-two.local python3 transcribe_worker.py
 """
 
+import asyncio
+import hashlib
 import os
+import signal
+import socket
 import sys
 import time
 import tempfile
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
-import requests
-import urllib3
+import httpx
 import whisper
 
-# Suppress SSL warnings for self-signed cert
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Shared audio helpers live in the API package (api/chunked_transcribe.py,
+# api/audio_preprocess.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from audio_preprocess import trim_silence
+from chunked_transcribe import ChunkedTranscriber
 
 # --- Configuration ---
-PI_BASE_URL = os.environ.get("MURMUR_API_URL", "http://murmur.local:5001")
-POLL_INTERVAL = int(os.environ.get("MURMUR_POLL_INTERVAL", "10"))
+PI_BASE_URLS = [url.strip().rstrip("/") for url in
+                os.environ.get("MURMUR_API_URL", "http://murmur.local:5001").split(",")
+                if url.strip()]
+POLL_INTERVAL = int(os.environ.get("MURMUR_POLL_INTERVAL", "10"))  # fallback when long-poll is unavailable
+WAIT_TIMEOUT = int(os.environ.get("MURMUR_WAIT_TIMEOUT", "50"))  # long-poll length (the Pi caps it at 50)
 WHISPER_MODEL = os.environ.get("MURMUR_WHISPER_MODEL", "base")
+WORKER_ID = os.environ.get("MURMUR_WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+LEASE_SECONDS = int(os.environ.get("MURMUR_LEASE_SECONDS", "300"))
+TRANSCRIBE_PROCESSES = int(os.environ.get(
+    "MURMUR_TRANSCRIBE_PROCESSES", str(max(1, min(4, (os.cpu_count() or 1) // 2)))))
+PREFETCH = int(os.environ.get("MURMUR_PREFETCH", "2"))  # downloaded entries waiting to transcribe, per Pi
+PUSH_BATCH = int(os.environ.get("MURMUR_PUSH_BATCH", "1"))  # >1: results per /api/entries/batch-update
+PUSH_LINGER = float(os.environ.get("MURMUR_PUSH_LINGER", "5"))  # seconds to wait for a batch to fill
+
+DOWNLOAD_CHUNK = 256 * 1024
+
+# Whisper calls block for seconds at a time; they run here, one at a time,
+# so the event loop stays free for network I/O
+_whisper_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+
+
+class DownloadError(Exception):
+    """The downloaded audio didn't match the size/hash the Pi reported."""
+
+
+class Stopped(Exception):
+    """The worker is shutting down; the awaited operation was abandoned."""
+
 
 # --- Whisper model (loaded once) ---
 _model = None
@@ -40,91 +104,479 @@ def get_model():
     return _model
 
 
-def fetch_untranscribed():
-    """Get the list of entries waiting for transcription."""
-    resp = requests.get(f"{PI_BASE_URL}/api/entries/untranscribed", timeout=10, verify=False)
-    resp.raise_for_status()
-    return resp.json()["entries"]
+_chunked = None
+
 
+def get_chunked_transcriber():
+    global _chunked
+    if _chunked is None:
+        _chunked = ChunkedTranscriber(WHISPER_MODEL, TRANSCRIBE_PROCESSES)
+    return _chunked
 
-def download_audio(filename):
-    """Download an audio file from the Pi to a temp file. Returns the path."""
-    resp = requests.get(f"{PI_BASE_URL}/api/audio/{filename}", timeout=30, verify=False)
-    resp.raise_for_status()
-    tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    tmp.write(resp.content)
-    tmp.close()
-    return tmp.name
 
+def transcribe_file(path):
+    """Transcribe a downloaded recording, chunk-parallel when configured.
 
-def push_transcription(entry_id, text):
-    """Send the transcription result back to the Pi."""
-    resp = requests.put(
-        f"{PI_BASE_URL}/api/entries/{entry_id}",
-        json={"transcription": text, "transcription_status": "done"},
-        timeout=10,
-        verify=False,
-    )
-    resp.raise_for_status()
+    Blocking; runs on the whisper thread. Returns (text, speech_seconds)
+    where speech_seconds is how much audio was left after silence trimming.
+    """
+    audio = whisper.load_audio(path)  # 16 kHz mono float32 via ffmpeg
+    samples = trim_silence(audio, 16000)
+    speech_seconds = len(samples) / 16000
+    print(f"[worker] Trimmed {len(audio) / 16000:.1f}s -> {speech_seconds:.1f}s of speech")
+    if TRANSCRIBE_PROCESSES <= 1:
+        text = get_model().transcribe(samples).get("text", "").strip()
+        return text, speech_seconds
+    start = time.monotonic()
+    text, chunks = get_chunked_transcriber().transcribe(samples)
+    print(f"[worker] {speech_seconds:.0f}s of audio in {chunks} chunks "
+          f"across {TRANSCRIBE_PROCESSES} processes: {time.monotonic() - start:.1f}s")
+    return text, speech_seconds
 
 
-def mark_failed(entry_id):
-    """Mark an entry as failed on the Pi."""
+async def until_stopped(aw, stopping):
+    """Await `aw`, unless `stopping` is set first: then cancel it and raise Stopped."""
+    task = asyncio.ensure_future(aw)
+    stopper = asyncio.ensure_future(stopping.wait())
     try:
-        requests.put(
-            f"{PI_BASE_URL}/api/entries/{entry_id}",
-            json={"transcription_status": "failed"},
-            timeout=10,
-            verify=False,
+        await asyncio.wait({task, stopper}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stopper.cancel()
+    if not task.done():
+        task.cancel()
+        raise Stopped
+    return task.result()
+
+
+class StageTimings:
+    """Wall time spent in each pipeline stage over one batch."""
+
+    STAGES = ("download", "transcribe", "push")
+
+    def __init__(self):
+        self._totals = {stage: [0, 0.0] for stage in self.STAGES}
+        self._start = time.monotonic()
+
+    def add(self, stage, seconds):
+        self._totals[stage][0] += 1
+        self._totals[stage][1] += seconds
+
+    def report(self, name):
+        wall = time.monotonic() - self._start
+        done = self._totals["push"][0]
+        if not self._totals["download"][0]:
+            return
+        print(f"[worker] {name}: batch of {done} entries in {wall:.1f}s")
+        for stage in self.STAGES:
+            count, total = self._totals[stage]
+            avg = total / count if count else 0
+            print(f"[worker]   {stage:<10} {count:>3} x {avg:6.1f}s avg "
+                  f"{total:7.1f}s total ({100 * total / max(wall, 1e-9):3.0f}% of wall)")
+
+
+class Heartbeat:
+    """Keep an entry's lease alive in the background while we work on it."""
+
+    def __init__(self, pi, entry_id):
+        self.pi = pi
+        self.entry_id = entry_id
+        self.lost = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                resp = await self.pi.post(
+                    f"/api/jobs/{self.entry_id}/heartbeat",
+                    {"worker_id": WORKER_ID, "lease_seconds": LEASE_SECONDS},
+                )
+                if resp.status_code == 409:
+                    self.lost = True
+                    self.pi.log(f"Entry {self.entry_id} lease lost")
+                    return
+            except httpx.HTTPError as e:
+                self.pi.log(f"Entry {self.entry_id} heartbeat failed: {e}")
+
+
+_END = None  # end-of-batch marker passed down the pipeline
+
+
+class Pi:
+    """One Pi's API, and the pipeline that works through its backlog."""
+
+    def __init__(self, client, base_url, stopping):
+        self.client = client
+        self.base_url = base_url
+        self.name = urlsplit(base_url).netloc or base_url
+        self.stopping = stopping
+        self.batch_update = PUSH_BATCH > 1  # off once the Pi turns out not to have it
+
+    def log(self, message):
+        print(f"[worker] {self.name}: {message}")
+
+    async def post(self, path, payload, timeout=10):
+        return await self.client.post(f"{self.base_url}{path}", json=payload, timeout=timeout)
+
+    # --- API calls ---
+
+    async def claim_job(self):
+        """Lease the oldest untranscribed entry. Returns it, or None if idle."""
+        resp = await self.post("/api/jobs/claim",
+                               {"worker_id": WORKER_ID, "limit": 1, "lease_seconds": LEASE_SECONDS})
+        resp.raise_for_status()
+        jobs = resp.json()["jobs"]
+        return jobs[0] if jobs else None
+
+    async def download_audio(self, entry):
+        """Stream an entry's audio to a temp file. Returns the path.
+
+        The file is written in DOWNLOAD_CHUNK pieces, so memory use doesn't
+        grow with the recording, and checked against the size and SHA-256
+        the Pi sent with the job. Raises DownloadError on a mismatch.
+        """
+        filename = entry["audio_filename"]
+        # Keep the extension (.wav/.flac/.opus/...) so ffmpeg probes it correctly
+        tmp = tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1] or ".wav", delete=False)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with self.client.stream("GET", f"{self.base_url}/api/audio/{filename}",
+                                          timeout=30) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK):
+                    tmp.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                expected_size = entry.get("audio_size") or resp.headers.get("Content-Length")
+            tmp.close()
+            if expected_size is not None and size != int(expected_size):
+                raise DownloadError(f"got {size} bytes, expected {expected_size}")
+            expected_hash = entry.get("audio_sha256")
+            if expected_hash and digest.hexdigest() != expected_hash:
+                raise DownloadError("SHA-256 mismatch")
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+        return tmp.name
+
+    async def push_transcription(self, entry_id, text, speech_seconds=None):
+        """Send the transcription result back and release the lease.
+
+        Returns False if our lease had expired and the result was discarded.
+        """
+        payload = {"worker_id": WORKER_ID, "transcription": text, "transcription_status": "done"}
+        if speech_seconds is not None:
+            payload["speech_seconds"] = round(speech_seconds, 2)
+        resp = await self.post(f"/api/jobs/{entry_id}/complete", payload)
+        if resp.status_code == 409:
+            return False
+        resp.raise_for_status()
+        return True
+
+    async def push_transcriptions(self, batch):
+        """Send several results in one /api/entries/batch-update call.
+
+        Returns whether each was applied (False: lease expired, result
+        discarded), or None if the Pi doesn't have the endpoint.
+        """
+        payload = {"worker_id": WORKER_ID, "results": []}
+        for entry, _, _, text, speech_seconds in batch:
+            result = {"id": entry["id"], "transcription": text, "transcription_status": "done"}
+            if speech_seconds is not None:
+                result["speech_seconds"] = round(speech_seconds, 2)
+            payload["results"].append(result)
+        resp = await self.post("/api/entries/batch-update", payload, timeout=30)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return [result["applied"] for result in resp.json()["results"]]
+
+    async def mark_failed(self, entry_id, error=None):
+        """Mark an entry as failed on the Pi and release the lease."""
+        try:
+            await self.post(f"/api/jobs/{entry_id}/complete",
+                            {"worker_id": WORKER_ID, "transcription_status": "failed", "error": error})
+        except Exception:
+            pass
+
+    async def release_job(self, entry_id):
+        """Give the lease back untouched so the entry can be retried right away."""
+        try:
+            await self.post(f"/api/jobs/{entry_id}/release", {"worker_id": WORKER_ID})
+        except Exception:
+            pass
+
+    async def wait_for_jobs(self, version):
+        """Block until the Pi reports new work (or the long-poll times out).
+
+        Returns the version to pass next time; None means long-polling isn't
+        available and we slept POLL_INTERVAL instead.
+        """
+        params = {} if version is None else {"since": version, "timeout": WAIT_TIMEOUT}
+        try:
+            resp = await self.client.get(f"{self.base_url}/api/jobs/wait", params=params,
+                                         timeout=WAIT_TIMEOUT + 10)
+            if resp.status_code == 404:
+                await asyncio.sleep(POLL_INTERVAL)  # older Pi
+                return None
+            resp.raise_for_status()
+            return resp.json()["version"]
+        except httpx.HTTPError as e:
+            self.log(f"Waiting for jobs failed ({e}) — polling in {POLL_INTERVAL}s")
+            await asyncio.sleep(POLL_INTERVAL)
+            return version
+
+    # --- Pipeline ---
+
+    def drop_lost(self, entry, heartbeat, path):
+        """Forget an entry whose lease renewal was refused (someone else has it now)."""
+        heartbeat.stop()
+        os.unlink(path)
+        self.log(f"Entry {entry['id']} dropped: lease lost")
+
+    async def abandon(self, entry, heartbeat, path):
+        """Hand an unfinished entry back to the Pi during shutdown."""
+        heartbeat.stop()
+        os.unlink(path)
+        await self.release_job(entry["id"])
+        self.log(f"Entry {entry['id']} released")
+
+    async def download_stage(self, ready, timings):
+        """Claim and download entries ahead of the transcriber until the backlog is empty.
+
+        `ready` is bounded, so this waits once PREFETCH entries are queued.
+        Each entry's lease is kept alive from claim until its result is pushed.
+        """
+        try:
+            while not self.stopping.is_set():
+                start = time.monotonic()
+                entry = await self.claim_job()
+                if entry is None:
+                    return
+                entry_id = entry["id"]
+                self.log(f"Downloading entry {entry_id}: {entry['audio_filename']}")
+                heartbeat = Heartbeat(self, entry_id)
+                heartbeat.start()
+                try:
+                    path = await until_stopped(self.download_audio(entry), self.stopping)
+                except (Stopped, DownloadError, httpx.TransportError) as e:
+                    # A transfer problem (or shutdown), not a bad recording
+                    # — don't use up an attempt
+                    heartbeat.stop()
+                    await self.release_job(entry_id)
+                    reason = "stopped" if isinstance(e, Stopped) else f"failed: {e}"
+                    self.log(f"Entry {entry_id} download {reason}, released")
+                    continue
+                except Exception as e:
+                    heartbeat.stop()
+                    traceback.print_exc()
+                    await self.mark_failed(entry_id, str(e))
+                    self.log(f"Entry {entry_id} FAILED")
+                    continue
+                timings.add("download", time.monotonic() - start)
+                await ready.put((entry, heartbeat, path))
+        except httpx.TransportError:
+            self.log("Pi unreachable — will retry")
+        except Exception:
+            traceback.print_exc()
+        finally:
+            await ready.put(_END)
+
+    async def transcribe_stage(self, ready, results, timings):
+        """Hand downloaded entries to the shared whisper thread, one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await ready.get()
+            if item is _END:
+                break
+            entry, heartbeat, path = item
+            entry_id = entry["id"]
+            if self.stopping.is_set():
+                await self.abandon(entry, heartbeat, path)
+                continue
+            if heartbeat.lost:
+                self.drop_lost(entry, heartbeat, path)
+                continue
+            start = time.monotonic()
+            try:
+                # On shutdown the result is dropped (Whisper can't be
+                # interrupted) and the entry released for someone else
+                text, speech_seconds = await until_stopped(
+                    loop.run_in_executor(_whisper_thread, transcribe_file, path), self.stopping)
+            except Stopped:
+                await self.abandon(entry, heartbeat, path)
+                continue
+            except Exception as e:
+                traceback.print_exc()
+                heartbeat.stop()
+                os.unlink(path)
+                await self.mark_failed(entry_id, str(e))
+                self.log(f"Entry {entry_id} FAILED")
+                continue
+            timings.add("transcribe", time.monotonic() - start)
+            await results.put((entry, heartbeat, path, text, speech_seconds))
+        await results.put(_END)
+
+    async def collect_results(self, results):
+        """Take the next results off the queue. Returns (batch, finished).
+
+        Normally one result; with batching, waits up to PUSH_LINGER for up
+        to PUSH_BATCH (less once shutting down).
+        """
+        item = await results.get()
+        if item is _END:
+            return [], True
+        batch = [item]
+        if not self.batch_update:
+            return batch, False
+        deadline = time.monotonic() + PUSH_LINGER
+        while len(batch) < PUSH_BATCH:
+            timeout = 0 if self.stopping.is_set() else max(deadline - time.monotonic(), 0)
+            try:
+                item = await asyncio.wait_for(results.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def push_one(self, item):
+        entry, heartbeat, path, text, speech_seconds = item
+        entry_id = entry["id"]
+        try:
+            if await self.push_transcription(entry_id, text, speech_seconds):
+                self.log(f"Entry {entry_id} done ({len(text)} chars)")
+            else:
+                self.log(f"Entry {entry_id} lease expired, result discarded")
+        except Exception as e:
+            traceback.print_exc()
+            await self.mark_failed(entry_id, str(e))
+            self.log(f"Entry {entry_id} FAILED")
+        finally:
+            heartbeat.stop()
+            os.unlink(path)
+
+    async def push_batch(self, batch):
+        """Push a batch in one call. Returns False to fall back to one at a time."""
+        try:
+            applied = await self.push_transcriptions(batch)
+        except Exception as e:
+            self.log(f"Batch update of {len(batch)} failed ({e}), pushing one at a time")
+            return False
+        if applied is None:
+            self.log("Pi has no /api/entries/batch-update, pushing one at a time")
+            self.batch_update = False
+            return False
+        for (entry, heartbeat, path, text, _), ok in zip(batch, applied):
+            if ok:
+                self.log(f"Entry {entry['id']} done ({len(text)} chars)")
+            else:
+                self.log(f"Entry {entry['id']} lease expired, result discarded")
+            heartbeat.stop()
+            os.unlink(path)
+        return True
+
+    async def push_stage(self, results, timings):
+        """Send transcriptions back while the next entry is decoding.
+
+        Keeps going during shutdown: a finished transcription is worth the
+        round trip.
+        """
+        finished = False
+        while not finished:
+            batch, finished = await self.collect_results(results)
+            for item in [item for item in batch if item[1].lost]:
+                batch.remove(item)
+                self.drop_lost(*item[:3])
+            if not batch:
+                continue
+            start = time.monotonic()
+            if len(batch) == 1 or not await self.push_batch(batch):
+                for item in batch:
+                    await self.push_one(item)
+            elapsed = time.monotonic() - start
+            for _ in batch:
+                timings.add("push", elapsed / len(batch))
+
+    async def run_batch(self):
+        """Work through everything currently claimable, pipelined."""
+        timings = StageTimings()
+        ready = asyncio.Queue(maxsize=max(1, PREFETCH))
+        results = asyncio.Queue()
+        await asyncio.gather(
+            self.download_stage(ready, timings),
+            self.transcribe_stage(ready, results, timings),
+            self.push_stage(results, timings),
         )
-    except Exception:
-        pass
+        timings.report(self.name)
 
+    async def run(self):
+        """Alternate batches and long-polls until the worker is stopped."""
+        version = None
+        while not self.stopping.is_set():
+            try:
+                await self.run_batch()
+            except Exception:
+                traceback.print_exc()
+            try:
+                version = await until_stopped(self.wait_for_jobs(version), self.stopping)
+            except Stopped:
+                break
 
-def process_entry(entry):
-    """Download, transcribe, and push back a single entry."""
-    entry_id = entry["id"]
-    filename = entry["audio_filename"]
-    print(f"[worker] Processing entry {entry_id}: {filename}")
 
-    tmp_path = download_audio(filename)
-    try:
-        model = get_model()
-        result = model.transcribe(tmp_path)
-        text = result.get("text", "").strip()
-        push_transcription(entry_id, text)
-        print(f"[worker] Entry {entry_id} done ({len(text)} chars)")
-    except Exception:
-        traceback.print_exc()
-        mark_failed(entry_id)
-        print(f"[worker] Entry {entry_id} FAILED")
-    finally:
-        os.unlink(tmp_path)
+async def serve():
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def stop():
+        if not stopping.is_set():
+            print("[worker] Shutting down — releasing unfinished entries")
+            stopping.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+
+    async with httpx.AsyncClient(verify=False) as client:  # self-signed cert
+        pis = [Pi(client, url, stopping) for url in PI_BASE_URLS]
+        await asyncio.gather(*(pi.run() for pi in pis))
+    print("[worker] Stopped")
 
 
 def main():
     print(f"[worker] Murmur transcription worker")
-    print(f"[worker] API: {PI_BASE_URL}")
+    for url in PI_BASE_URLS:
+        print(f"[worker] API: {url}")
+    print(f"[worker] Worker ID: {WORKER_ID}")
     print(f"[worker] Model: {WHISPER_MODEL}")
-    print(f"[worker] Poll interval: {POLL_INTERVAL}s")
+    print(f"[worker] Processes: {TRANSCRIBE_PROCESSES}")
+    print(f"[worker] Prefetch: {PREFETCH} per Pi")
+    if PUSH_BATCH > 1:
+        print(f"[worker] Push batch: up to {PUSH_BATCH} results, {PUSH_LINGER:g}s linger")
+    print(f"[worker] Long-poll: {WAIT_TIMEOUT}s (fallback poll {POLL_INTERVAL}s)")
     print()
 
-    # Eagerly load the model so it's ready when work arrives
-    get_model()
-
-    while True:
-        try:
-            entries = fetch_untranscribed()
-            if entries:
-                print(f"[worker] Found {len(entries)} untranscribed entries")
-                for entry in entries:
-                    process_entry(entry)
-        except requests.ConnectionError:
-            print("[worker] Pi unreachable — will retry")
-        except Exception:
-            traceback.print_exc()
+    # Eagerly load the model so it's ready when work arrives (pool
+    # processes load their own copy on first use)
+    if TRANSCRIBE_PROCESSES <= 1:
+        get_model()
 
-        time.sleep(POLL_INTERVAL)
+    try:
+        asyncio.run(serve())
+    finally:
+        # A transcription still running on the whisper thread is let finish
+        # before the process exits, but its entry has already been released
+        _whisper_thread.shutdown(wait=False, cancel_futures=True)
+        if _chunked is not None:
+            _chunked.shutdown()
 
 
 if __name__ == "__main__":